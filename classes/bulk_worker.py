@@ -0,0 +1,85 @@
+# classes/bulk_worker.py
+import threading
+import time
+from PyQt6.QtCore import QThread, pyqtSignal
+
+class BulkOperationThread(QThread):
+    """Runs one set-based bulk operation ('delete', 'reassign' or 'undo') off the GUI thread."""
+    progress = pyqtSignal(int, str)
+    finished = pyqtSignal(str)
+    error = pyqtSignal(str)
+    def __init__(self, db, operation, conv_db_ids=None, new_model=None, journal_id=None):
+        super().__init__()
+        self.db = db
+        self.operation = operation
+        self.conv_db_ids = conv_db_ids or []
+        self.new_model = new_model
+        self.journal_id = journal_id
+    def run(self):
+        try:
+            if self.operation == "delete":
+                count = self.db.bulk_delete_conversations(self.conv_db_ids, self.progress.emit)
+                message = None if count is None else f"Deleted {count} conversation(s)."
+            elif self.operation == "reassign":
+                count = self.db.bulk_reassign_model(self.conv_db_ids, self.new_model, self.progress.emit)
+                message = None if count is None else f"Reassigned {count} conversation(s) to '{self.new_model}'."
+            elif self.operation == "undo":
+                description = self.db.undo_bulk_operation(self.journal_id, self.progress.emit)
+                message = None if description is None else f"Undid: {description}."
+            else:
+                message = None
+        except Exception as e:
+            # _run_bulk has already rolled back; without a signal the bulk controls would stay disabled.
+            self.error.emit(f"Bulk {self.operation} failed: {e}")
+            return
+        if message is None:
+            self.error.emit(f"Bulk {self.operation} failed; no changes were made.")
+        else:
+            self.finished.emit(message)
+
+class ConversationSearchThread(QThread):
+    """
+    Runs the bulk list's find_conversations query off the GUI thread. Only the most recent
+    request is kept; results of a superseded request are never emitted.
+    """
+    # request_id, [(conversation_db_id, label), ...]
+    results_ready = pyqtSignal(int, list)
+
+    def __init__(self, db):
+        super().__init__()
+        self.db = db
+        self._condition = threading.Condition()
+        self._pending = None
+        self._latest_id = 0
+        self._running = True
+
+    def request(self, filters):
+        """Queues a search with find_conversations keyword arguments and returns its request id."""
+        with self._condition:
+            self._latest_id += 1
+            self._pending = (self._latest_id, filters)
+            self._condition.notify()
+            return self._latest_id
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._latest_id += 1
+            self._condition.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and self._running:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                request_id, filters = self._pending
+                self._pending = None
+            rows = []
+            for db_id, summary, source_model, creation_date, turn_count in self.db.find_conversations(**filters) or []:
+                created = time.strftime("%Y-%m-%d", time.localtime(creation_date)) if creation_date else "?"
+                rows.append((db_id, f"{summary}  [{source_model} | {created} | {turn_count} turns]"))
+            if request_id == self._latest_id:
+                self.results_ready.emit(request_id, rows)
@@ -1,9 +1,20 @@
 # classes/chat_tab.py
+import itertools
+from collections import OrderedDict
+import markdown
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
-    QTextEdit, QPushButton, QComboBox, QApplication
+    QTextEdit, QPushButton, QComboBox, QApplication,
+    QListView, QStyledItemDelegate, QAbstractItemView
 )
-from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtCore import Qt, pyqtSignal, QAbstractListModel, QModelIndex, QSize, QPoint, QTimer
+from PyQt6.QtGui import QTextDocument, QAbstractTextDocumentLayout, QPalette, QColor
+
+# Local imports
+from config import CHAT_WINDOW_TURNS, CHAT_RENDER_CACHE_SIZE
+
+UID_ROLE = Qt.ItemDataRole.UserRole + 1
+KIND_ROLE = Qt.ItemDataRole.UserRole + 2
 
 class ChatInputBox(QTextEdit):
     """A QTextEdit that emits a signal on Enter and adds a newline on Shift+Enter."""
@@ -18,6 +29,239 @@ class ChatInputBox(QTextEdit):
         else:
             super().keyPressEvent(event)
 
+class ChatMessageModel(QAbstractListModel):
+    """
+    Holds a bounded window of chat messages. Each message is a dict with 'uid', 'kind'
+    ('user', 'assistant' or 'note'), 'text' and 'key', the (timestamp_utc, id) of its turn
+    in the database, or None for messages not loaded from it.
+    """
+    def __init__(self, max_messages, parent=None):
+        super().__init__(parent)
+        self.max_messages = max_messages
+        self.messages = []
+        self._uids = itertools.count()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.messages)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        message = self.messages[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return message["text"]
+        if role == UID_ROLE:
+            return message["uid"]
+        if role == KIND_ROLE:
+            return message["kind"]
+        return None
+
+    def make_message(self, kind, text, key=None):
+        return {"uid": next(self._uids), "kind": kind, "text": text, "key": key}
+
+    def turns_to_messages(self, rows):
+        messages = []
+        for timestamp_utc, turn_id, user_prompt, assistant_response in rows:
+            key = (timestamp_utc, turn_id)
+            messages.append(self.make_message("user", user_prompt, key))
+            messages.append(self.make_message("assistant", assistant_response, key))
+        return messages
+
+    def reset(self, messages):
+        self.beginResetModel()
+        self.messages = list(messages)
+        self.endResetModel()
+
+    def prepend(self, messages):
+        """Inserts at the top; returns True if messages were evicted from the bottom."""
+        if not messages:
+            return False
+        self.beginInsertRows(QModelIndex(), 0, len(messages) - 1)
+        self.messages[0:0] = messages
+        self.endInsertRows()
+        return self._evict(from_top=False)
+
+    def append(self, messages):
+        """Adds at the bottom; returns True if messages were evicted from the top."""
+        if not messages:
+            return False
+        first = len(self.messages)
+        self.beginInsertRows(QModelIndex(), first, first + len(messages) - 1)
+        self.messages.extend(messages)
+        self.endInsertRows()
+        return self._evict(from_top=True)
+
+    def _evict(self, from_top):
+        # Whole turns only, so the window edges always fall on turn boundaries.
+        count = 0
+        while len(self.messages) - count > self.max_messages:
+            edge = count if from_top else len(self.messages) - 1 - count
+            key = self.messages[edge]["key"]
+            count += 1
+            while count < len(self.messages) and key is not None:
+                edge = count if from_top else len(self.messages) - 1 - count
+                if self.messages[edge]["key"] != key:
+                    break
+                count += 1
+        if not count:
+            return False
+        first, last = (0, count - 1) if from_top else (len(self.messages) - count, len(self.messages) - 1)
+        self.beginRemoveRows(QModelIndex(), first, last)
+        del self.messages[first:last + 1]
+        self.endRemoveRows()
+        return True
+
+    def row_for_uid(self, uid):
+        for row, message in enumerate(self.messages):
+            if message["uid"] == uid:
+                return row
+        return None
+
+    def edge_key(self, newest):
+        messages = reversed(self.messages) if newest else self.messages
+        return next((message["key"] for message in messages if message["key"] is not None), None)
+
+class ChatMessageDelegate(QStyledItemDelegate):
+    """Renders each message's markdown on demand, keeping a bounded cache of laid-out documents."""
+    PADDING = 6
+
+    def __init__(self, view):
+        super().__init__(view)
+        self.view = view
+        self._documents = OrderedDict()
+
+    def _document(self, index, width):
+        # Keyed by uid only: a new width just re-lays out the cached document, markdown is parsed once.
+        uid = index.data(UID_ROLE)
+        document = self._documents.get(uid)
+        if document is not None:
+            self._documents.move_to_end(uid)
+            if document.textWidth() != width:
+                document.setTextWidth(width)
+            return document
+        kind, text = index.data(KIND_ROLE), index.data(Qt.ItemDataRole.DisplayRole)
+        if kind == "user":
+            html = f"<p><b style='color:#D3D3D3;'>You:</b><br>{markdown.markdown(text)}</p>"
+        elif kind == "assistant":
+            html = f"<p><b style='color:#00AACC;'>AI:</b><br>{markdown.markdown(text)}</p><hr>"
+        else:
+            html = f"<p><i>{text}</i></p>"
+        document = QTextDocument()
+        document.setHtml(html)
+        document.setTextWidth(width)
+        self._documents[uid] = document
+        if len(self._documents) > CHAT_RENDER_CACHE_SIZE:
+            self._documents.popitem(last=False)
+        return document
+
+    def _text_width(self):
+        return max(self.view.viewport().width() - 2 * self.PADDING, 50)
+
+    def sizeHint(self, option, index):
+        document = self._document(index, self._text_width())
+        return QSize(self._text_width(), int(document.size().height()) + 2 * self.PADDING)
+
+    def paint(self, painter, option, index):
+        document = self._document(index, self._text_width())
+        context = QAbstractTextDocumentLayout.PaintContext()
+        context.palette.setColor(QPalette.ColorRole.Text, QColor("#D3D3D3"))
+        painter.save()
+        painter.translate(option.rect.left() + self.PADDING, option.rect.top() + self.PADDING)
+        document.documentLayout().draw(painter, context)
+        painter.restore()
+
+class ChatHistoryView(QListView):
+    """
+    Virtualized chat transcript. Only a window of CHAT_WINDOW_TURNS turns is held and only
+    visible messages are painted; reaching the top or bottom edge asks for the next page.
+    """
+    olderRequested = pyqtSignal()
+    newerRequested = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.message_model = ChatMessageModel(2 * CHAT_WINDOW_TURNS, self)
+        self.delegate = ChatMessageDelegate(self)
+        self.setModel(self.message_model)
+        self.setItemDelegate(self.delegate)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.setResizeMode(QListView.ResizeMode.Adjust)
+        self.has_older = False
+        self.has_newer = False
+        self._loading = False
+        self.verticalScrollBar().valueChanged.connect(self._check_edges)
+
+    def show_note(self, text):
+        self.has_older = self.has_newer = False
+        self._loading = False
+        self.message_model.reset([self.message_model.make_message("note", text)])
+
+    def set_turns(self, rows, has_older):
+        """Shows the given (timestamp_utc, id, user_prompt, assistant_response) rows, oldest first, scrolled to the end."""
+        self.has_older, self.has_newer = has_older, False
+        self._loading = False
+        self.message_model.reset(self.message_model.turns_to_messages(rows))
+        self.scrollToBottom()
+        QTimer.singleShot(0, self._check_edges)
+
+    def prepend_turns(self, rows, has_older):
+        anchor = self._capture_anchor()
+        self.has_older = has_older
+        if self.message_model.prepend(self.message_model.turns_to_messages(rows)):
+            self.has_newer = True
+        self._restore_anchor(anchor)
+        self._loading = False
+
+    def append_turns(self, rows, has_newer):
+        anchor = self._capture_anchor()
+        self.has_newer = has_newer
+        if self.message_model.append(self.message_model.turns_to_messages(rows)):
+            self.has_older = True
+        self._restore_anchor(anchor)
+        self._loading = False
+
+    def append_message(self, kind, text):
+        """Adds a live message at the end of the conversation and follows it."""
+        if self.message_model.append([self.message_model.make_message(kind, text)]):
+            self.has_older = True
+        self.scrollToBottom()
+
+    def oldest_key(self):
+        return self.message_model.edge_key(newest=False)
+
+    def newest_key(self):
+        return self.message_model.edge_key(newest=True)
+
+    def _check_edges(self, *args):
+        if self._loading:
+            return
+        scroll_bar = self.verticalScrollBar()
+        if self.has_older and scroll_bar.value() <= scroll_bar.minimum():
+            self._loading = True
+            self.olderRequested.emit()
+        elif self.has_newer and scroll_bar.value() >= scroll_bar.maximum():
+            self._loading = True
+            self.newerRequested.emit()
+
+    def _capture_anchor(self):
+        index = self.indexAt(QPoint(1, 1))
+        if not index.isValid():
+            return None
+        return index.data(UID_ROLE), self.visualRect(index).top()
+
+    def _restore_anchor(self, anchor):
+        """Keeps the message that was at the top of the viewport in the same place after the window moves."""
+        if anchor is None:
+            return
+        uid, offset = anchor
+        row = self.message_model.row_for_uid(uid)
+        if row is None:
+            return
+        self.doItemsLayout()
+        self.scrollTo(self.message_model.index(row), QAbstractItemView.ScrollHint.PositionAtTop)
+        self.verticalScrollBar().setValue(self.verticalScrollBar().value() - offset)
+
 class ChatTab(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -29,12 +273,15 @@ class ChatTab(QWidget):
         top_bar_layout = QHBoxLayout()
         self.model_combo = QComboBox()
         self.load_model_button = QPushButton("Load Model")
+        self.server_button = QPushButton("Start API Server")
+        self.server_button.setEnabled(False)
         self.status_label = QLabel("No model loaded.")
         self.status_label.setObjectName("ChatStatusLabel")
         
         top_bar_layout.addWidget(QLabel("Model:"))
         top_bar_layout.addWidget(self.model_combo)
         top_bar_layout.addWidget(self.load_model_button)
+        top_bar_layout.addWidget(self.server_button)
         top_bar_layout.addStretch()
         top_bar_layout.addWidget(self.status_label)
         main_layout.addLayout(top_bar_layout)
@@ -51,8 +298,7 @@ class ChatTab(QWidget):
         conv_management_layout.addWidget(self.create_button)
         main_layout.addLayout(conv_management_layout)
 
-        self.history_display = QTextEdit()
-        self.history_display.setReadOnly(True)
+        self.history_display = ChatHistoryView()
         self.history_display.setObjectName("ChatHistory")
         main_layout.addWidget(self.history_display)
         
@@ -1,5 +1,32 @@
 # classes/data_management_tab.py
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, QTextEdit, QFormLayout, QSpacerItem, QSizePolicy
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, QTextEdit, QFormLayout,
+    QGroupBox, QListView, QAbstractItemView, QLineEdit, QSpinBox, QDateEdit, QCheckBox, QProgressBar
+)
+from PyQt6.QtCore import Qt, QDate, QAbstractListModel, QModelIndex
+
+class ConversationListModel(QAbstractListModel):
+    """(conversation_db_id, label) rows for the bulk list; the id is exposed as UserRole."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.rows[index.row()][1]
+        if role == Qt.ItemDataRole.UserRole:
+            return self.rows[index.row()][0]
+        return None
+
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self.rows = rows
+        self.endResetModel()
 
 class DataManagementTab(QWidget):
     def __init__(self, parent=None):
@@ -8,7 +35,7 @@ class DataManagementTab(QWidget):
 
     def init_ui(self):
         main_layout = QVBoxLayout(self)
-        
+
         # --- Top controls for filtering and deleting ---
         controls_layout = QFormLayout()
 
@@ -19,14 +46,94 @@ class DataManagementTab(QWidget):
         controls_layout.addRow("Filter by Model:", self.model_filter_combo)
         controls_layout.addRow("Select Conversation:", self.delete_combo)
         controls_layout.addRow(self.delete_button)
-        
+
         main_layout.addLayout(controls_layout)
 
+        content_layout = QHBoxLayout()
+
+        # --- Bulk curation: filters, multi-select list and set-based operations ---
+        bulk_group = QGroupBox("Bulk Curation")
+        bulk_layout = QVBoxLayout(bulk_group)
+        filters_layout = QFormLayout()
+
+        date_layout = QHBoxLayout()
+        self.date_filter_check = QCheckBox("Created between")
+        self.date_from_edit = QDateEdit(QDate.currentDate().addMonths(-1))
+        self.date_from_edit.setCalendarPopup(True)
+        self.date_to_edit = QDateEdit(QDate.currentDate())
+        self.date_to_edit.setCalendarPopup(True)
+        date_layout.addWidget(self.date_filter_check)
+        date_layout.addWidget(self.date_from_edit)
+        date_layout.addWidget(QLabel("and"))
+        date_layout.addWidget(self.date_to_edit)
+
+        length_layout = QHBoxLayout()
+        self.min_turns_spin = QSpinBox()
+        self.min_turns_spin.setRange(0, 1000000)
+        self.max_turns_spin = QSpinBox()
+        self.max_turns_spin.setRange(0, 1000000)
+        self.max_turns_spin.setSpecialValueText("No limit")
+        length_layout.addWidget(self.min_turns_spin)
+        length_layout.addWidget(QLabel("to"))
+        length_layout.addWidget(self.max_turns_spin)
+
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Match summary or turn text...")
+        self.apply_filters_button = QPushButton("Apply Filters")
+
+        filters_layout.addRow("Date:", date_layout)
+        filters_layout.addRow("Turns:", length_layout)
+        filters_layout.addRow("Search:", self.search_input)
+        filters_layout.addRow(self.apply_filters_button)
+        bulk_layout.addLayout(filters_layout)
+
+        # A model-backed view with uniform rows stays responsive with tens of thousands of conversations.
+        self.bulk_model = ConversationListModel(self)
+        self.bulk_list = QListView()
+        self.bulk_list.setModel(self.bulk_model)
+        self.bulk_list.setUniformItemSizes(True)
+        self.bulk_list.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.bulk_count_label = QLabel("0 conversations, 0 selected")
+        bulk_layout.addWidget(self.bulk_list)
+        bulk_layout.addWidget(self.bulk_count_label)
+
+        actions_layout = QHBoxLayout()
+        self.select_all_button = QPushButton("Select All")
+        self.bulk_delete_button = QPushButton("Delete Selected")
+        self.undo_button = QPushButton("Undo Last Bulk Operation")
+        actions_layout.addWidget(self.select_all_button)
+        actions_layout.addWidget(self.bulk_delete_button)
+        actions_layout.addWidget(self.undo_button)
+        bulk_layout.addLayout(actions_layout)
+
+        reassign_layout = QHBoxLayout()
+        self.reassign_model_combo = QComboBox()
+        self.reassign_model_combo.setEditable(True)
+        self.reassign_button = QPushButton("Reassign Source Model")
+        reassign_layout.addWidget(self.reassign_model_combo, stretch=1)
+        reassign_layout.addWidget(self.reassign_button)
+        bulk_layout.addLayout(reassign_layout)
+
+        self.bulk_progress = QProgressBar()
+        self.bulk_progress.setVisible(False)
+        bulk_layout.addWidget(self.bulk_progress)
+
         # --- Preview Pane ---
-        main_layout.addWidget(QLabel("Conversation Preview:"))
+        preview_widget = QWidget()
+        preview_layout = QVBoxLayout(preview_widget)
+        preview_layout.addWidget(QLabel("Conversation Preview:"))
         self.preview_pane = QTextEdit()
         self.preview_pane.setReadOnly(True)
         self.preview_pane.setObjectName("PreviewPane")
-        main_layout.addWidget(self.preview_pane)
-        
+        preview_layout.addWidget(self.preview_pane)
+
+        content_layout.addWidget(bulk_group, stretch=1)
+        content_layout.addWidget(preview_widget, stretch=1)
+        main_layout.addLayout(content_layout)
+
         self.setLayout(main_layout)
+
+    def set_bulk_controls_enabled(self, enabled):
+        for widget in (self.apply_filters_button, self.select_all_button, self.bulk_delete_button,
+                       self.undo_button, self.reassign_button, self.bulk_list):
+            widget.setEnabled(enabled)
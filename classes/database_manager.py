@@ -1,13 +1,25 @@
 # classes/database_manager.py
+import json
+import os
 import sqlite3
 import time
 
+# Every insert, update and delete on these tables is recorded in `changelog`
+# under a monotonic sequence number, so exports can resume from a watermark.
+TRACKED_TABLES = ("conversations", "turns")
+# Number of bulk operations kept in the undo journal.
+UNDO_JOURNAL_LIMIT = 10
+
+CONVERSATION_COLUMNS = "id, conversation_id_str, summary, source_model, creation_date"
+TURN_COLUMNS = "id, conversation_id, user_prompt, assistant_response, timestamp_utc"
+
 class DatabaseManager:
     def __init__(self, db_path):
         self.db_path = db_path
         self.init_db()
 
     def _execute(self, query, params=(), fetch=None):
+        con = None
         try:
             con = sqlite3.connect(self.db_path)
             con.execute("PRAGMA foreign_keys = ON")
@@ -23,11 +35,14 @@ class DatabaseManager:
                 result = cur.lastrowid
             
             con.commit()
-            con.close()
             return result
         except sqlite3.Error as e:
             print(f"Database error: {e}")
             return None
+        finally:
+            # A failed write must not leave its connection (and write lock) open.
+            if con is not None:
+                con.close()
 
     def init_db(self):
         self._execute("""
@@ -41,6 +56,38 @@ class DatabaseManager:
             )
         """)
         self._execute("""CREATE TABLE IF NOT EXISTS conversations (id INTEGER PRIMARY KEY, conversation_id_str TEXT UNIQUE, summary TEXT, source_model TEXT, creation_date REAL)""")
+        self._execute("CREATE INDEX IF NOT EXISTS idx_turns_conversation ON turns (conversation_id, timestamp_utc, id)")
+        # WAL lets snapshot and export readers run alongside the GUI's writes.
+        self._execute("PRAGMA journal_mode=WAL", fetch='one')
+        self.init_change_tracking()
+        self.init_undo_journal()
+        self.init_split_tables()
+
+    def init_change_tracking(self):
+        # AUTOINCREMENT guarantees sequence numbers are never reused, even after deletes.
+        self._execute("""
+            CREATE TABLE IF NOT EXISTS changelog (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                op TEXT NOT NULL,
+                changed_at REAL
+            )
+        """)
+        self._execute("CREATE INDEX IF NOT EXISTS idx_changelog_row ON changelog (table_name, row_id)")
+        now_sql = "(julianday('now') - 2440587.5) * 86400.0"
+        for table in TRACKED_TABLES:
+            for op, ref in (("insert", "NEW"), ("update", "NEW"), ("delete", "OLD")):
+                self._execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS {table}_changelog_{op} AFTER {op.upper()} ON {table}
+                    BEGIN
+                        INSERT INTO changelog (table_name, row_id, op, changed_at) VALUES ('{table}', {ref}.id, '{op}', {now_sql});
+                    END
+                """)
+        # Databases created before change tracking existed: log their rows once so watermark 0 exports everything.
+        if self._execute("SELECT COUNT(*) FROM changelog", fetch='one')[0] == 0:
+            for table in TRACKED_TABLES:
+                self._execute(f"INSERT INTO changelog (table_name, row_id, op, changed_at) SELECT '{table}', id, 'insert', ? FROM {table} ORDER BY id", (time.time(),))
 
     def delete_conversation(self, conversation_db_id):
         """Deletes a conversation and all of its associated turns manually."""
@@ -48,11 +95,384 @@ class DatabaseManager:
             with sqlite3.connect(self.db_path) as con:
                 cur = con.cursor()
                 cur.execute("DELETE FROM turns WHERE conversation_id = ?", (conversation_db_id,))
+                cur.execute("DELETE FROM split_assignments WHERE conversation_id = ?", (conversation_db_id,))
                 cur.execute("DELETE FROM conversations WHERE id = ?", (conversation_db_id,))
                 con.commit()
         except sqlite3.Error as e:
             print(f"Database error during delete: {e}")
 
+    def init_undo_journal(self):
+        self._execute("""CREATE TABLE IF NOT EXISTS undo_journal (id INTEGER PRIMARY KEY, operation TEXT, description TEXT, created_at REAL)""")
+        self._execute("""CREATE TABLE IF NOT EXISTS undo_conversations (journal_id INTEGER, id INTEGER, conversation_id_str TEXT, summary TEXT, source_model TEXT, creation_date REAL)""")
+        self._execute("""CREATE TABLE IF NOT EXISTS undo_turns (journal_id INTEGER, id INTEGER, conversation_id INTEGER, user_prompt TEXT, assistant_response TEXT, timestamp_utc REAL)""")
+        self._execute("CREATE INDEX IF NOT EXISTS idx_undo_conversations_journal ON undo_conversations (journal_id)")
+        self._execute("""CREATE TABLE IF NOT EXISTS undo_split_assignments (journal_id INTEGER, split_name TEXT, conversation_id INTEGER, split TEXT, stratum TEXT)""")
+        self._execute("CREATE INDEX IF NOT EXISTS idx_undo_turns_journal ON undo_turns (journal_id)")
+        self._execute("CREATE INDEX IF NOT EXISTS idx_undo_split_assignments_journal ON undo_split_assignments (journal_id)")
+
+    def init_split_tables(self):
+        self._execute("""CREATE TABLE IF NOT EXISTS split_definitions (name TEXT PRIMARY KEY, params TEXT, created_at REAL)""")
+        self._execute("""
+            CREATE TABLE IF NOT EXISTS split_assignments (
+                split_name TEXT,
+                conversation_id INTEGER,
+                split TEXT,
+                stratum TEXT,
+                PRIMARY KEY (split_name, conversation_id),
+                FOREIGN KEY (conversation_id) REFERENCES conversations (id) ON DELETE CASCADE
+            )
+        """)
+
+    def get_change_watermark(self):
+        result = self._execute("SELECT COALESCE(MAX(seq), 0) FROM changelog", fetch='one')
+        return result[0] if result else 0
+
+    def get_changes_since(self, watermark):
+        """
+        Returns the net changes with sequence numbers above `watermark`.
+        Rows still present are returned in full; rows deleted since are returned as ids.
+        Everything is read from a single snapshot, and the returned 'watermark' is the
+        value to pass in next time.
+        """
+        changes = {"since": watermark, "watermark": watermark}
+        try:
+            con = sqlite3.connect(self.db_path)
+            con.row_factory = sqlite3.Row
+            try:
+                con.execute("BEGIN")
+                high = con.execute("SELECT COALESCE(MAX(seq), 0) FROM changelog").fetchone()[0]
+                changes["watermark"] = high
+                for table in TRACKED_TABLES:
+                    changed_ids = "SELECT DISTINCT row_id FROM changelog WHERE table_name = ? AND seq > ? AND seq <= ?"
+                    params = (table, watermark, high)
+                    changes[table] = [dict(row) for row in con.execute(
+                        f"SELECT * FROM {table} WHERE id IN ({changed_ids}) ORDER BY id", params)]
+                    changes[f"deleted_{table}"] = [row[0] for row in con.execute(
+                        f"SELECT row_id FROM ({changed_ids}) WHERE row_id NOT IN (SELECT id FROM {table}) ORDER BY row_id", params)]
+            finally:
+                con.close()
+        except sqlite3.Error as e:
+            print(f"Database error during change export: {e}")
+            return None
+        return changes
+
+    def export_changes_since(self, watermark, output_path):
+        """Writes changes above `watermark` to a JSON Lines file and returns the new watermark."""
+        changes = self.get_changes_since(watermark)
+        if changes is None:
+            return None
+        with open(output_path, "w", encoding="utf-8") as f:
+            for table in TRACKED_TABLES:
+                for row in changes[table]:
+                    f.write(json.dumps({"table": table, "op": "upsert", "row": row}) + "\n")
+                for row_id in changes[f"deleted_{table}"]:
+                    f.write(json.dumps({"table": table, "op": "delete", "id": row_id}) + "\n")
+        return changes["watermark"]
+
+    def create_snapshot(self, dest_path):
+        """
+        Copies a consistent snapshot of the live database with the SQLite backup API.
+        In WAL mode the copy reads from a fixed snapshot, so concurrent writers are not blocked.
+        """
+        try:
+            if os.path.dirname(dest_path):
+                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            src = sqlite3.connect(self.db_path)
+            dst = sqlite3.connect(dest_path)
+            try:
+                src.backup(dst)
+            finally:
+                dst.close()
+                src.close()
+            return True
+        except sqlite3.Error as e:
+            print(f"Database error during snapshot: {e}")
+            return False
+
+    # --- Bulk curation ---
+    def find_conversations(self, model_name=None, date_from=None, date_to=None, min_turns=None, max_turns=None, search=None):
+        """Returns (id, summary, source_model, creation_date, turn_count) for conversations matching every given filter."""
+        query = """
+            SELECT c.id, c.summary, c.source_model, c.creation_date, COUNT(t.id) AS turn_count
+            FROM conversations c LEFT JOIN turns t ON t.conversation_id = c.id
+            WHERE 1 = 1"""
+        params = []
+        if model_name:
+            query += " AND c.source_model = ?"
+            params.append(model_name)
+        if date_from is not None:
+            query += " AND c.creation_date >= ?"
+            params.append(date_from)
+        if date_to is not None:
+            query += " AND c.creation_date < ?"
+            params.append(date_to)
+        if search:
+            pattern = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            query += """ AND (c.summary LIKE ? ESCAPE '\\' OR EXISTS (
+                SELECT 1 FROM turns s WHERE s.conversation_id = c.id
+                AND (s.user_prompt LIKE ? ESCAPE '\\' OR s.assistant_response LIKE ? ESCAPE '\\')))"""
+            params.extend([pattern, pattern, pattern])
+        query += " GROUP BY c.id"
+        having = []
+        if min_turns is not None:
+            having.append("turn_count >= ?")
+            params.append(min_turns)
+        if max_turns is not None:
+            having.append("turn_count <= ?")
+            params.append(max_turns)
+        if having:
+            query += " HAVING " + " AND ".join(having)
+        query += " ORDER BY c.creation_date DESC"
+        return self._execute(query, tuple(params), fetch='all')
+
+    def _begin_bulk(self, conv_db_ids):
+        """Opens a write transaction with the target ids loaded into the temp table `bulk_ids`."""
+        con = sqlite3.connect(self.db_path, isolation_level=None)
+        con.execute("PRAGMA foreign_keys = ON")
+        con.execute("BEGIN IMMEDIATE")
+        con.execute("CREATE TEMP TABLE IF NOT EXISTS bulk_ids (id INTEGER PRIMARY KEY)")
+        con.execute("DELETE FROM bulk_ids")
+        con.executemany("INSERT OR IGNORE INTO bulk_ids (id) VALUES (?)", ((conv_db_id,) for conv_db_id in conv_db_ids))
+        return con
+
+    def _journal(self, con, operation, description, include_turns):
+        journal_id = con.execute("INSERT INTO undo_journal (operation, description, created_at) VALUES (?, ?, ?)",
+                                 (operation, description, time.time())).lastrowid
+        con.execute(f"INSERT INTO undo_conversations (journal_id, {CONVERSATION_COLUMNS}) SELECT ?, {CONVERSATION_COLUMNS} FROM conversations WHERE id IN (SELECT id FROM bulk_ids)", (journal_id,))
+        if include_turns:
+            con.execute(f"INSERT INTO undo_turns (journal_id, {TURN_COLUMNS}) SELECT ?, {TURN_COLUMNS} FROM turns WHERE conversation_id IN (SELECT id FROM bulk_ids)", (journal_id,))
+            # Split assignments cascade with their conversations, so they are journaled alongside the turns.
+            con.execute("INSERT INTO undo_split_assignments (journal_id, split_name, conversation_id, split, stratum) SELECT ?, split_name, conversation_id, split, stratum FROM split_assignments WHERE conversation_id IN (SELECT id FROM bulk_ids)", (journal_id,))
+        # Keep only the most recent entries.
+        con.execute("DELETE FROM undo_journal WHERE id NOT IN (SELECT id FROM undo_journal ORDER BY id DESC LIMIT ?)", (UNDO_JOURNAL_LIMIT,))
+        con.execute("DELETE FROM undo_conversations WHERE journal_id NOT IN (SELECT id FROM undo_journal)")
+        con.execute("DELETE FROM undo_turns WHERE journal_id NOT IN (SELECT id FROM undo_journal)")
+        con.execute("DELETE FROM undo_split_assignments WHERE journal_id NOT IN (SELECT id FROM undo_journal)")
+        return journal_id
+
+    def _run_bulk(self, conv_db_ids, steps, progress_callback):
+        """Runs `steps(con, report)` inside one transaction, rolling everything back on error."""
+        report = progress_callback or (lambda percent, message: None)
+        try:
+            report(0, "Preparing selection...")
+            con = self._begin_bulk(conv_db_ids)
+            try:
+                result = steps(con, report)
+                report(95, "Committing...")
+                con.execute("COMMIT")
+            except Exception:
+                con.execute("ROLLBACK")
+                raise
+            finally:
+                con.close()
+        except sqlite3.Error as e:
+            print(f"Database error during bulk operation: {e}")
+            return None
+        report(100, "Done.")
+        return result
+
+    def bulk_delete_conversations(self, conv_db_ids, progress_callback=None):
+        """Deletes the conversations and their turns in one transaction. Returns the number deleted."""
+        def steps(con, report):
+            count = con.execute("SELECT COUNT(*) FROM conversations WHERE id IN (SELECT id FROM bulk_ids)").fetchone()[0]
+            report(10, "Journaling for undo...")
+            self._journal(con, "delete", f"Deleted {count} conversation(s)", include_turns=True)
+            report(40, "Deleting turns...")
+            con.execute("DELETE FROM turns WHERE conversation_id IN (SELECT id FROM bulk_ids)")
+            report(70, "Deleting conversations...")
+            con.execute("DELETE FROM conversations WHERE id IN (SELECT id FROM bulk_ids)")
+            return count
+        return self._run_bulk(conv_db_ids, steps, progress_callback)
+
+    def bulk_reassign_model(self, conv_db_ids, new_model, progress_callback=None):
+        """Sets source_model on the conversations in one transaction. Returns the number updated."""
+        def steps(con, report):
+            count = con.execute("SELECT COUNT(*) FROM conversations WHERE id IN (SELECT id FROM bulk_ids)").fetchone()[0]
+            report(10, "Journaling for undo...")
+            self._journal(con, "reassign", f"Reassigned {count} conversation(s) to '{new_model}'", include_turns=False)
+            report(50, "Updating source model...")
+            con.execute("UPDATE conversations SET source_model = ? WHERE id IN (SELECT id FROM bulk_ids)", (new_model,))
+            return count
+        return self._run_bulk(conv_db_ids, steps, progress_callback)
+
+    def get_latest_undo_entry(self):
+        return self._execute("SELECT id, operation, description FROM undo_journal ORDER BY id DESC LIMIT 1", fetch='one')
+
+    def _map_restored_ids(self, con, table, undo_table, map_table, journal_id):
+        """
+        Fills the temp table `map_table` (old_id -> new_id) for rows being restored from `undo_table`.
+        Ids are not AUTOINCREMENT, so a deleted id may have been reused since; those rows get fresh
+        ids above every existing and restored id, the rest keep their original id.
+        """
+        con.execute(f"CREATE TEMP TABLE IF NOT EXISTS {map_table} (old_id INTEGER PRIMARY KEY, new_id INTEGER UNIQUE)")
+        con.execute(f"DELETE FROM {map_table}")
+        con.execute(f"INSERT INTO {map_table} (old_id, new_id) SELECT id, id FROM {undo_table} WHERE journal_id = ? AND id NOT IN (SELECT id FROM {table})", (journal_id,))
+        base = con.execute(f"SELECT MAX(COALESCE((SELECT MAX(id) FROM {table}), 0), COALESCE((SELECT MAX(id) FROM {undo_table} WHERE journal_id = ?), 0))", (journal_id,)).fetchone()[0]
+        con.execute(f"""
+            INSERT INTO {map_table} (old_id, new_id)
+            SELECT id, ? + ROW_NUMBER() OVER (ORDER BY id) FROM {undo_table} WHERE journal_id = ? AND id IN (SELECT id FROM {table})
+        """, (base, journal_id))
+
+    def undo_bulk_operation(self, journal_id, progress_callback=None):
+        """Reverts a journaled bulk operation and removes it from the journal. Returns its description."""
+        def steps(con, report):
+            entry = con.execute("SELECT operation, description FROM undo_journal WHERE id = ?", (journal_id,)).fetchone()
+            if entry is None:
+                raise sqlite3.Error(f"No undo journal entry {journal_id}")
+            operation, description = entry
+            if operation == "delete":
+                report(20, "Restoring conversations...")
+                self._map_restored_ids(con, "conversations", "undo_conversations", "restore_conversation_ids", journal_id)
+                # A new conversation may have taken a restored conversation_id_str; rename the restored copy.
+                con.execute("""
+                    INSERT INTO conversations (id, conversation_id_str, summary, source_model, creation_date)
+                    SELECT m.new_id,
+                           CASE WHEN EXISTS (SELECT 1 FROM conversations c WHERE c.conversation_id_str = u.conversation_id_str)
+                                THEN u.conversation_id_str || '-restored-' || ? || '-' || m.new_id
+                                ELSE u.conversation_id_str END,
+                           u.summary, u.source_model, u.creation_date
+                    FROM undo_conversations u JOIN restore_conversation_ids m ON m.old_id = u.id
+                    WHERE u.journal_id = ? ORDER BY u.id
+                """, (journal_id, journal_id))
+                report(50, "Restoring turns...")
+                self._map_restored_ids(con, "turns", "undo_turns", "restore_turn_ids", journal_id)
+                con.execute("""
+                    INSERT INTO turns (id, conversation_id, user_prompt, assistant_response, timestamp_utc)
+                    SELECT mt.new_id, mc.new_id, u.user_prompt, u.assistant_response, u.timestamp_utc
+                    FROM undo_turns u
+                    JOIN restore_turn_ids mt ON mt.old_id = u.id
+                    JOIN restore_conversation_ids mc ON mc.old_id = u.conversation_id
+                    WHERE u.journal_id = ?
+                """, (journal_id,))
+                # Skip assignments to splits that were deleted or rebuilt since; a rebuild supersedes them.
+                con.execute("""
+                    INSERT OR IGNORE INTO split_assignments (split_name, conversation_id, split, stratum)
+                    SELECT u.split_name, mc.new_id, u.split, u.stratum
+                    FROM undo_split_assignments u
+                    JOIN restore_conversation_ids mc ON mc.old_id = u.conversation_id
+                    JOIN split_definitions d ON d.name = u.split_name AND d.created_at <= (SELECT created_at FROM undo_journal WHERE id = ?)
+                    WHERE u.journal_id = ?
+                """, (journal_id, journal_id))
+            elif operation == "reassign":
+                report(30, "Restoring source models...")
+                con.execute("""
+                    UPDATE conversations SET source_model = (
+                        SELECT u.source_model FROM undo_conversations u WHERE u.journal_id = ? AND u.id = conversations.id)
+                    WHERE id IN (SELECT id FROM undo_conversations WHERE journal_id = ?)
+                """, (journal_id, journal_id))
+            report(80, "Clearing journal entry...")
+            con.execute("DELETE FROM undo_conversations WHERE journal_id = ?", (journal_id,))
+            con.execute("DELETE FROM undo_turns WHERE journal_id = ?", (journal_id,))
+            con.execute("DELETE FROM undo_split_assignments WHERE journal_id = ?", (journal_id,))
+            con.execute("DELETE FROM undo_journal WHERE id = ?", (journal_id,))
+            return description
+        return self._run_bulk([], steps, progress_callback)
+
+    # --- Dataset splits ---
+    def iter_conversation_lengths(self, batch_size=1000, con=None):
+        """
+        Streams (id, conversation_id_str, source_model, turn_count, char_count) for every conversation,
+        on `con` if given. Errors are raised rather than printed, so a caller such as save_split can roll back.
+        """
+        own_connection = con is None
+        if own_connection:
+            con = sqlite3.connect(self.db_path)
+        try:
+            cur = con.execute("""
+                SELECT c.id, c.conversation_id_str, c.source_model, COUNT(t.id),
+                       COALESCE(SUM(LENGTH(t.user_prompt) + LENGTH(t.assistant_response)), 0)
+                FROM conversations c LEFT JOIN turns t ON t.conversation_id = c.id
+                GROUP BY c.id ORDER BY c.id
+            """)
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            if own_connection:
+                con.close()
+
+    def save_split(self, split_name, params, build_assignments):
+        """
+        Replaces the stored split `split_name`. `build_assignments(con)` must return an iterable of
+        (conversation_db_id, split, stratum) read through `con`. It is consumed inside one read
+        transaction, so every pass sees the same snapshot, and staged in a temp table; the write
+        lock is only held for the final swap. Returns the number of rows stored.
+        """
+        try:
+            con = sqlite3.connect(self.db_path, isolation_level=None)
+            try:
+                con.execute("CREATE TEMP TABLE IF NOT EXISTS staged_split (conversation_id INTEGER PRIMARY KEY, split TEXT, stratum TEXT)")
+                con.execute("DELETE FROM staged_split")
+                con.execute("BEGIN")
+                con.executemany("INSERT INTO staged_split (conversation_id, split, stratum) VALUES (?, ?, ?)", build_assignments(con))
+                con.execute("COMMIT")
+
+                con.execute("BEGIN IMMEDIATE")
+                con.execute("INSERT OR REPLACE INTO split_definitions (name, params, created_at) VALUES (?, ?, ?)",
+                            (split_name, json.dumps(params), time.time()))
+                con.execute("DELETE FROM split_assignments WHERE split_name = ?", (split_name,))
+                # Conversations deleted since the snapshot are dropped here.
+                cur = con.execute("""
+                    INSERT INTO split_assignments (split_name, conversation_id, split, stratum)
+                    SELECT ?, s.conversation_id, s.split, s.stratum FROM staged_split s JOIN conversations c ON c.id = s.conversation_id
+                """, (split_name,))
+                count = cur.rowcount
+                con.execute("COMMIT")
+            except Exception:
+                if con.in_transaction:
+                    con.execute("ROLLBACK")
+                raise
+            finally:
+                con.close()
+            return count
+        except sqlite3.Error as e:
+            print(f"Database error while saving split: {e}")
+            return None
+
+    def get_split_definition(self, split_name):
+        result = self._execute("SELECT params FROM split_definitions WHERE name = ?", (split_name,), fetch='one')
+        return json.loads(result[0]) if result else None
+
+    def get_split_names(self):
+        return self._execute("SELECT name FROM split_definitions ORDER BY name", fetch='all')
+
+    def get_split_counts(self, split_name):
+        return self._execute("""
+            SELECT a.split, a.stratum, COUNT(*) FROM split_assignments a JOIN conversations c ON c.id = a.conversation_id
+            WHERE a.split_name = ? GROUP BY a.split, a.stratum ORDER BY a.split, a.stratum
+        """, (split_name,), fetch='all')
+
+    def get_split_conversation_ids(self, split_name, split):
+        return self._execute("""
+            SELECT a.conversation_id FROM split_assignments a JOIN conversations c ON c.id = a.conversation_id
+            WHERE a.split_name = ? AND a.split = ? ORDER BY a.conversation_id
+        """, (split_name, split), fetch='all')
+
+    def iter_split_turns(self, split_name, split, batch_size=1000):
+        """
+        Streams (conversation_id_str, user_prompt, assistant_response) for one side of a split, grouped by conversation.
+        Errors are raised rather than printed, so an export is never silently truncated.
+        """
+        con = sqlite3.connect(self.db_path)
+        try:
+            cur = con.execute("""
+                SELECT c.conversation_id_str, t.user_prompt, t.assistant_response
+                FROM split_assignments a
+                JOIN conversations c ON c.id = a.conversation_id
+                JOIN turns t ON t.conversation_id = c.id
+                WHERE a.split_name = ? AND a.split = ?
+                ORDER BY c.id, t.timestamp_utc, t.id
+            """, (split_name, split))
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            con.close()
+
     def get_all_conversations(self):
         return self._execute("SELECT id, summary FROM conversations ORDER BY creation_date DESC", fetch='all')
 
@@ -71,6 +491,22 @@ class DatabaseManager:
     def get_conversation_turns(self, conv_db_id):
         return self._execute("SELECT user_prompt, assistant_response FROM turns WHERE conversation_id = ? ORDER BY timestamp_utc ASC", (conv_db_id,), fetch='all')
 
+    def get_conversation_turns_page(self, conv_db_id, limit, after_key=None, newest_first=False):
+        """
+        Returns up to `limit` turns as (timestamp_utc, id, user_prompt, assistant_response), oldest
+        first or newest first. Pass the (timestamp_utc, id) of the previous page's last row as
+        `after_key` to continue from it.
+        """
+        direction, comparison = ("DESC", "<") if newest_first else ("ASC", ">")
+        query = "SELECT timestamp_utc, id, user_prompt, assistant_response FROM turns WHERE conversation_id = ?"
+        params = [conv_db_id]
+        if after_key is not None:
+            query += f" AND (timestamp_utc, id) {comparison} (?, ?)"
+            params.extend(after_key)
+        query += f" ORDER BY timestamp_utc {direction}, id {direction} LIMIT ?"
+        params.append(limit)
+        return self._execute(query, tuple(params), fetch='all')
+
     def update_conversation_summary(self, conv_id_str, new_summary):
         self._execute("UPDATE conversations SET summary = ? WHERE conversation_id_str = ?", (new_summary, conv_id_str))
 
@@ -0,0 +1,455 @@
+# classes/inference_server.py
+# OpenAI-compatible /v1/chat/completions server for the resident chat model.
+import asyncio
+import json
+import threading
+import time
+import uuid
+import torch
+import torch.nn.functional as F
+from PyQt6.QtCore import QThread, pyqtSignal
+
+# --- KV cache helpers ---
+# transformers has shipped three cache layouts (legacy tuples, DynamicCache with
+# key_cache/value_cache lists, DynamicCache with per-layer objects). These helpers
+# read and replace the per-layer (key, value) tensors regardless of layout.
+def _get_kv(cache):
+    if hasattr(cache, "layers"):
+        return [(layer.keys, layer.values) for layer in cache.layers]
+    if hasattr(cache, "key_cache"):
+        return list(zip(cache.key_cache, cache.value_cache))
+    return list(cache)
+
+def _set_kv(cache, pairs):
+    if hasattr(cache, "layers"):
+        for layer, (keys, values) in zip(cache.layers, pairs):
+            layer.keys, layer.values = keys, values
+        return cache
+    if hasattr(cache, "key_cache"):
+        cache.key_cache = [keys for keys, _ in pairs]
+        cache.value_cache = [values for _, values in pairs]
+        return cache
+    return tuple(pairs)
+
+def _left_pad(tensor, pad_len, dim):
+    if pad_len == 0:
+        return tensor
+    # F.pad counts dimensions from the last one backwards, two entries each.
+    padding = [0, 0] * (tensor.dim() - 1 - dim) + [pad_len, 0]
+    return F.pad(tensor, padding)
+
+
+class _GenerationRequest:
+    """One client completion request moving through the batch scheduler."""
+    def __init__(self, messages, prompt_ids, max_new_tokens, temperature, top_p, top_k, repetition_penalty):
+        self.id = f"chatcmpl-{uuid.uuid4().hex}"
+        self.created = int(time.time())
+        self.messages = messages
+        self.prompt_ids = prompt_ids
+        self.max_new_tokens = max_new_tokens
+        self.temperature = temperature
+        self.top_p = top_p
+        self.top_k = top_k
+        self.repetition_penalty = repetition_penalty
+        self.generated_ids = []
+        self.emitted_text = ""
+        self.finish_reason = None
+        self.cancelled = False
+        self.error = None
+        # Receives (delta_text, finish_reason) tuples from the scheduler; finish_reason "error" comes with self.error set.
+        self.events = asyncio.Queue()
+
+    def fail(self, message):
+        self.error = message
+        self.finish_reason = "error"
+        self.events.put_nowait(("", "error"))
+
+
+class ContinuousBatchScheduler:
+    """
+    Runs in-flight batched decoding over every active request.
+
+    New requests are prefilled and merged into the running batch between decode
+    steps, and finished requests are dropped from it immediately, so a long
+    generation never holds up a short one queued behind it.
+    """
+    def __init__(self, model, tokenizer, max_batch_size=8):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_batch_size = max_batch_size
+        self.device = model.device
+        self.pending = asyncio.Queue()
+        self.active = []
+        self.cache = None
+        self.attention_mask = None
+        self.next_tokens = None
+
+        stop_ids = {tokenizer.eos_token_id}
+        generation_eos = getattr(getattr(model, "generation_config", None), "eos_token_id", None)
+        if isinstance(generation_eos, int):
+            stop_ids.add(generation_eos)
+        elif generation_eos:
+            stop_ids.update(generation_eos)
+        end_of_turn = tokenizer.convert_tokens_to_ids("<end_of_turn>")
+        if end_of_turn is not None and end_of_turn != tokenizer.unk_token_id:
+            stop_ids.add(end_of_turn)
+        self.stop_ids = {token_id for token_id in stop_ids if token_id is not None}
+
+    async def submit(self, request):
+        await self.pending.put(request)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            admitted = []
+            if not self.active:
+                admitted.append(await self.pending.get())
+            while len(self.active) + len(admitted) < self.max_batch_size and not self.pending.empty():
+                admitted.append(self.pending.get_nowait())
+            admitted = [request for request in admitted if not request.cancelled]
+            if not admitted and not self.active:
+                continue
+            try:
+                events = await loop.run_in_executor(None, self._step, admitted)
+            except Exception as e:
+                for request in self.active + admitted:
+                    request.fail(f"Generation error: {e}")
+                self._reset_batch()
+                continue
+            for request, delta, finish_reason in events:
+                request.events.put_nowait((delta, finish_reason))
+
+    def fail_all(self, message):
+        while not self.pending.empty():
+            self.pending.get_nowait().fail(message)
+        for request in self.active:
+            request.fail(message)
+        self._reset_batch()
+
+    def _reset_batch(self):
+        self.active = []
+        self.cache = None
+        self.attention_mask = None
+        self.next_tokens = None
+
+    # --- Worker-thread methods (called through run_in_executor) ---
+    @torch.inference_mode()
+    def _step(self, admitted):
+        sampled = []
+        if self.active:
+            sampled.extend(zip(self.active, self._decode()))
+        if admitted:
+            sampled.extend(zip(admitted, self._prefill(admitted)))
+        return self._advance(sampled)
+
+    def _prefill(self, requests):
+        max_len = max(len(request.prompt_ids) for request in requests)
+        pad_id = self.tokenizer.pad_token_id or 0
+        input_ids = torch.tensor(
+            [[pad_id] * (max_len - len(r.prompt_ids)) + r.prompt_ids for r in requests], device=self.device)
+        attention_mask = torch.tensor(
+            [[0] * (max_len - len(r.prompt_ids)) + [1] * len(r.prompt_ids) for r in requests], device=self.device)
+        position_ids = (attention_mask.cumsum(-1) - 1).clamp(min=0)
+        outputs = self.model(input_ids=input_ids, attention_mask=attention_mask, position_ids=position_ids, use_cache=True)
+        tokens = self._sample(outputs.logits[:, -1, :], requests)
+        self._merge(requests, outputs.past_key_values, attention_mask, tokens)
+        return tokens.tolist()
+
+    def _decode(self):
+        attention_mask = torch.cat([self.attention_mask, torch.ones_like(self.attention_mask[:, :1])], dim=-1)
+        position_ids = self.attention_mask.sum(-1, keepdim=True)
+        outputs = self.model(
+            input_ids=self.next_tokens.unsqueeze(-1), attention_mask=attention_mask,
+            position_ids=position_ids, past_key_values=self.cache, use_cache=True)
+        self.cache = outputs.past_key_values
+        self.attention_mask = attention_mask
+        tokens = self._sample(outputs.logits[:, -1, :], self.active)
+        self.next_tokens = tokens
+        return tokens.tolist()
+
+    def _merge(self, requests, cache, attention_mask, tokens):
+        """Left-pads the new and running batches to a common length and concatenates them."""
+        if not self.active:
+            self.active, self.cache, self.attention_mask, self.next_tokens = list(requests), cache, attention_mask, tokens
+            return
+        old_len, new_len = self.attention_mask.shape[-1], attention_mask.shape[-1]
+        target = max(old_len, new_len)
+        merged = []
+        for (old_k, old_v), (new_k, new_v) in zip(_get_kv(self.cache), _get_kv(cache)):
+            merged.append((
+                torch.cat([_left_pad(old_k, target - old_len, 2), _left_pad(new_k, target - new_len, 2)], dim=0),
+                torch.cat([_left_pad(old_v, target - old_len, 2), _left_pad(new_v, target - new_len, 2)], dim=0),
+            ))
+        self.cache = _set_kv(self.cache, merged)
+        self.attention_mask = torch.cat([
+            _left_pad(self.attention_mask, target - old_len, 1), _left_pad(attention_mask, target - new_len, 1)], dim=0)
+        self.next_tokens = torch.cat([self.next_tokens, tokens], dim=0)
+        self.active.extend(requests)
+
+    def _sample(self, logits, requests):
+        logits = logits.float()
+        tokens = []
+        for row, request in enumerate(requests):
+            row_logits = logits[row]
+            if request.repetition_penalty != 1.0:
+                seen = torch.tensor(request.prompt_ids + request.generated_ids, device=row_logits.device).unique()
+                scores = row_logits[seen]
+                row_logits[seen] = torch.where(scores < 0, scores * request.repetition_penalty, scores / request.repetition_penalty)
+            if request.temperature <= 0:
+                tokens.append(int(row_logits.argmax()))
+                continue
+            row_logits = row_logits / request.temperature
+            if request.top_k > 0:
+                kth = torch.topk(row_logits, min(request.top_k, row_logits.shape[-1])).values[-1]
+                row_logits[row_logits < kth] = float("-inf")
+            if request.top_p < 1.0:
+                sorted_logits, sorted_idx = torch.sort(row_logits, descending=True)
+                cumulative = sorted_logits.softmax(-1).cumsum(-1)
+                remove = cumulative > request.top_p
+                remove[1:] = remove[:-1].clone()
+                remove[0] = False
+                row_logits[sorted_idx[remove]] = float("-inf")
+            tokens.append(int(torch.multinomial(row_logits.softmax(-1), 1)))
+        return torch.tensor(tokens, device=self.device)
+
+    def _advance(self, sampled):
+        """Records sampled tokens, builds text deltas and retires finished requests."""
+        events = []
+        for request, token_id in sampled:
+            finish_reason = None
+            if request.cancelled:
+                finish_reason = "cancelled"
+            elif token_id in self.stop_ids:
+                finish_reason = "stop"
+            else:
+                request.generated_ids.append(token_id)
+                if len(request.generated_ids) >= request.max_new_tokens:
+                    finish_reason = "length"
+            text = self.tokenizer.decode(request.generated_ids, skip_special_tokens=True)
+            # Hold back partially decoded multi-byte characters until they complete.
+            delta = ""
+            if finish_reason or not text.endswith("\ufffd"):
+                delta = text[len(request.emitted_text):]
+                request.emitted_text = text
+            request.finish_reason = finish_reason
+            if delta or finish_reason:
+                events.append((request, delta, finish_reason))
+
+        keep = [row for row, request in enumerate(self.active) if request.finish_reason is None]
+        if len(keep) != len(self.active):
+            if not keep:
+                self._reset_batch()
+            else:
+                index = torch.tensor(keep, device=self.device)
+                self.active = [self.active[row] for row in keep]
+                self.attention_mask = self.attention_mask[index]
+                self.next_tokens = self.next_tokens[index]
+                # Drop leading columns that are now padding for every remaining row.
+                first = int(self.attention_mask.any(dim=0).int().argmax())
+                self.attention_mask = self.attention_mask[:, first:]
+                self.cache = _set_kv(self.cache, [
+                    (keys[index][:, :, first:], values[index][:, :, first:]) for keys, values in _get_kv(self.cache)])
+        return events
+
+
+class InferenceServer:
+    """Minimal asyncio HTTP server exposing the OpenAI chat completions API."""
+    def __init__(self, model, tokenizer, model_name, host="127.0.0.1", port=8000, max_batch_size=8, db=None, max_new_tokens=1536):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.model_name = model_name
+        self.host = host
+        self.port = port
+        self.max_batch_size = max_batch_size
+        self.db = db
+        self.max_new_tokens = max_new_tokens
+        self.max_positions = getattr(getattr(model, "config", None), "max_position_embeddings", None)
+        self.server_conv_db_id = None
+        # _log_exchange runs in the executor, so completions finishing together must not race to create the conversation.
+        self.log_lock = threading.Lock()
+        self.loop = None
+        self.stop_event = None
+        # stop() may be called from another thread before serve() has created its loop.
+        self.stop_lock = threading.Lock()
+        self.stop_requested = False
+
+    async def serve(self, on_ready=None):
+        with self.stop_lock:
+            self.loop = asyncio.get_running_loop()
+            self.stop_event = asyncio.Event()
+            if self.stop_requested:
+                return
+        self.scheduler = ContinuousBatchScheduler(self.model, self.tokenizer, self.max_batch_size)
+        scheduler_task = asyncio.create_task(self.scheduler.run())
+        server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        if on_ready:
+            on_ready(f"http://{self.host}:{self.port}/v1")
+        try:
+            await self.stop_event.wait()
+        finally:
+            server.close()
+            await server.wait_closed()
+            scheduler_task.cancel()
+            self.scheduler.fail_all("Server shutting down")
+
+    def stop(self):
+        with self.stop_lock:
+            self.stop_requested = True
+            if self.loop and self.stop_event:
+                self.loop.call_soon_threadsafe(self.stop_event.set)
+
+    # --- HTTP handling ---
+    async def _handle_client(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0) or 0))
+            path = path.split("?", 1)[0]
+
+            if method == "GET" and path == "/v1/models":
+                await self._send_json(writer, 200, {"object": "list", "data": [
+                    {"id": self.model_name, "object": "model", "created": 0, "owned_by": "convoforge"}]})
+            elif method == "POST" and path == "/v1/chat/completions":
+                await self._chat_completions(writer, body)
+            else:
+                await self._send_error(writer, 404, f"No route for {method} {path}")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            try:
+                await self._send_error(writer, 500, str(e))
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+
+    async def _chat_completions(self, writer, body):
+        try:
+            payload = json.loads(body or b"{}")
+            messages = payload["messages"]
+            prompt = self.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+            requested_tokens = int(payload.get("max_tokens") or payload.get("max_completion_tokens") or self.max_new_tokens)
+            if requested_tokens <= 0:
+                raise ValueError("max_tokens must be positive")
+            request = _GenerationRequest(
+                messages,
+                self.tokenizer.encode(prompt, add_special_tokens=False),
+                max_new_tokens=min(requested_tokens, self.max_new_tokens),
+                temperature=float(payload.get("temperature", 0.8)),
+                top_p=float(payload.get("top_p", 0.95)),
+                top_k=int(payload.get("top_k", 50)),
+                repetition_penalty=float(payload.get("repetition_penalty", 1.15)),
+            )
+        except Exception as e:
+            await self._send_error(writer, 400, f"Invalid request: {e}")
+            return
+        # Reject oversized requests here; inside the batch an OOM would fail every active request.
+        total_tokens = len(request.prompt_ids) + request.max_new_tokens
+        if self.max_positions and total_tokens > self.max_positions:
+            await self._send_error(writer, 400,
+                f"Prompt ({len(request.prompt_ids)} tokens) plus max_tokens ({request.max_new_tokens}) exceeds the "
+                f"model's context window of {self.max_positions} tokens.")
+            return
+        await self.scheduler.submit(request)
+
+        if payload.get("stream"):
+            await self._stream_response(writer, request)
+        else:
+            text, finish_reason = "", None
+            while finish_reason is None:
+                delta, finish_reason = await request.events.get()
+                text += delta
+            if finish_reason == "error":
+                await self._send_error(writer, 500, request.error)
+                return
+            await self._send_json(writer, 200, {
+                "id": request.id, "object": "chat.completion", "created": request.created, "model": self.model_name,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": finish_reason}],
+                "usage": {
+                    "prompt_tokens": len(request.prompt_ids),
+                    "completion_tokens": len(request.generated_ids),
+                    "total_tokens": len(request.prompt_ids) + len(request.generated_ids),
+                },
+            })
+        if request.finish_reason in ("stop", "length"):
+            await self.loop.run_in_executor(None, self._log_exchange, request)
+
+    async def _stream_response(self, writer, request):
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\nConnection: close\r\n\r\n")
+
+        def chunk(delta, finish_reason=None):
+            return {"id": request.id, "object": "chat.completion.chunk", "created": request.created,
+                    "model": self.model_name, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+        try:
+            await self._send_event(writer, chunk({"role": "assistant", "content": ""}))
+            finish_reason = None
+            while finish_reason is None:
+                delta, finish_reason = await request.events.get()
+                if delta:
+                    await self._send_event(writer, chunk({"content": delta}))
+            if finish_reason == "error":
+                # An error event instead of a final chunk, so clients don't take the failure for a completion.
+                await self._send_event(writer, {"error": {"message": request.error, "type": "server_error"}})
+                return
+            await self._send_event(writer, chunk({}, finish_reason))
+            writer.write(b"data: [DONE]\n\n")
+            await writer.drain()
+        except ConnectionError:
+            # Client went away; the scheduler drops the request on its next step.
+            request.cancelled = True
+
+    async def _send_event(self, writer, data):
+        writer.write(f"data: {json.dumps(data)}\n\n".encode("utf-8"))
+        await writer.drain()
+
+    async def _send_json(self, writer, status, data):
+        body = json.dumps(data).encode("utf-8")
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}.get(status, "")
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+
+    async def _send_error(self, writer, status, message):
+        await self._send_json(writer, status, {"error": {"message": message, "type": "invalid_request_error" if status < 500 else "server_error"}})
+
+    # --- Database logging ---
+    def _log_exchange(self, request):
+        """Saves the last user message and the reply as a turn under this server session's conversation."""
+        if self.db is None:
+            return
+        user_prompt = next((m.get("content", "") for m in reversed(request.messages) if m.get("role") == "user"), "")
+        with self.log_lock:
+            if self.server_conv_db_id is None:
+                search_pattern = f"{self.model_name}-server-%"
+                next_num = self.db.get_next_conversation_num(search_pattern)
+                conv_id_str = f"{self.model_name}-server-{next_num:02}"
+                summary = f"API server session {time.strftime('%Y-%m-%d %H:%M')}"
+                self.server_conv_db_id = self.db.create_conversation(conv_id_str, summary, self.model_name)
+            if self.server_conv_db_id is None:
+                # Creation failed (already reported by DatabaseManager); never write turns without a conversation.
+                return
+            self.db.save_turn(self.server_conv_db_id, user_prompt, request.emitted_text.strip())
+
+
+class InferenceServerThread(QThread):
+    started_serving = pyqtSignal(str)
+    error = pyqtSignal(str)
+    def __init__(self, model, tokenizer, model_name, host, port, max_batch_size=8, db=None, max_new_tokens=1536):
+        super().__init__()
+        self.server = InferenceServer(model, tokenizer, model_name, host, port, max_batch_size, db, max_new_tokens)
+    def run(self):
+        try:
+            asyncio.run(self.server.serve(on_ready=self.started_serving.emit))
+        except Exception as e:
+            self.error.emit(str(e))
+    def stop(self):
+        self.server.stop()
@@ -1,23 +1,79 @@
 # classes/inference_workers.py
 import torch
+from importlib.metadata import version, PackageNotFoundError
 from PyQt6.QtCore import QThread, pyqtSignal
 from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig
 from peft import PeftModel
 
+# Local imports
+from .model_cache import PreparedModelCache, adapter_digest, base_model_digest
+
+def _library_versions():
+    versions = {}
+    for package in ("torch", "transformers", "bitsandbytes", "peft"):
+        try:
+            versions[package] = version(package)
+        except PackageNotFoundError:
+            versions[package] = None
+    return versions
+
 class ModelLoaderThread(QThread):
     finished = pyqtSignal(object, object)
+    progress = pyqtSignal(str)
     error = pyqtSignal(str)
-    def __init__(self, model_id, adapter_path=None):
+    def __init__(self, model_id, adapter_path=None, cache_dir=None, merge_adapter=False):
         super().__init__()
         self.model_id = model_id
         self.adapter_path = adapter_path
+        self.cache_dir = cache_dir
+        self.merge_adapter = merge_adapter
     def run(self):
         try:
             bnb_config = BitsAndBytesConfig(load_in_4bit=True, bnb_4bit_quant_type="nf4", bnb_4bit_compute_dtype=torch.bfloat16, bnb_4bit_use_double_quant=False)
-            base_model = AutoModelForCausalLM.from_pretrained(self.model_id, quantization_config=bnb_config, device_map={"": 0})
-            tokenizer = AutoTokenizer.from_pretrained(self.model_id)
-            tokenizer.pad_token = tokenizer.eos_token
-            model = PeftModel.from_pretrained(base_model, self.adapter_path) if self.adapter_path else base_model
+            merge = bool(self.adapter_path and self.merge_adapter)
+            cache = PreparedModelCache(self.cache_dir) if self.cache_dir else None
+            cached_path = None
+            if cache:
+                self.progress.emit("Checking prepared-model cache...")
+                base_revision = base_model_digest(self.model_id)
+                if base_revision is None:
+                    # Without a revision a changed checkpoint could not be told apart from the cached one.
+                    self.progress.emit("Could not identify the base model revision; not using the cache.")
+                    cache = None
+            if cache:
+                adapter_hash = adapter_digest(self.adapter_path) if merge else None
+                key, description = cache.make_key(self.model_id, base_revision, bnb_config.to_dict(), self.adapter_path if merge else None,
+                                                  adapter_hash, _library_versions())
+                cached_path = cache.lookup(self.model_id, key)
+
+            if cached_path:
+                # Weights are already quantized (and merged); safetensors shards are memory-mapped.
+                self.progress.emit("Cache hit: loading prepared weights...")
+                base_model = AutoModelForCausalLM.from_pretrained(cached_path, device_map={"": 0})
+                tokenizer = AutoTokenizer.from_pretrained(cached_path)
+                tokenizer.pad_token = tokenizer.eos_token
+            else:
+                self.progress.emit("Loading and quantizing base model...")
+                base_model = AutoModelForCausalLM.from_pretrained(self.model_id, quantization_config=bnb_config, device_map={"": 0})
+                self.progress.emit("Loading tokenizer...")
+                tokenizer = AutoTokenizer.from_pretrained(self.model_id)
+                tokenizer.pad_token = tokenizer.eos_token
+                if merge:
+                    self.progress.emit("Merging adapter into base weights...")
+                    base_model = PeftModel.from_pretrained(base_model, self.adapter_path).merge_and_unload()
+                if cache:
+                    self.progress.emit("Saving prepared weights to cache...")
+                    try:
+                        cache.store(self.model_id, key, description, base_model, tokenizer)
+                    except Exception as e:
+                        # A failed save only costs the speed-up next time.
+                        self.progress.emit(f"Could not cache prepared model: {e}")
+
+            if self.adapter_path and not merge:
+                self.progress.emit("Applying adapter...")
+                model = PeftModel.from_pretrained(base_model, self.adapter_path)
+            else:
+                model = base_model
             self.finished.emit(model, tokenizer)
         except Exception as e:
             self.error.emit(str(e))
@@ -25,18 +81,29 @@ class ModelLoaderThread(QThread):
 class InferenceThread(QThread):
     finished = pyqtSignal(str)
     error = pyqtSignal(str)
-    def __init__(self, model, tokenizer, chat_history):
+    def __init__(self, model, tokenizer, chat_history, max_new_tokens=1536):
         super().__init__()
         self.model = model
         self.tokenizer = tokenizer
-        self.chat_history = chat_history
+        self.chat_history = list(chat_history)
+        self.max_new_tokens = max_new_tokens
+    def build_prompt(self):
+        """Drops the oldest turns until the prompt leaves room for max_new_tokens in the model's context window."""
+        max_positions = getattr(getattr(self.model, "config", None), "max_position_embeddings", None)
+        messages = self.chat_history
+        while True:
+            prompt = self.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+            prompt_tokens = len(self.tokenizer.encode(prompt, add_special_tokens=False))
+            if not max_positions or len(messages) <= 1 or prompt_tokens + self.max_new_tokens <= max_positions:
+                return prompt
+            messages = messages[2:]
     def run(self):
         try:
-            prompt = self.tokenizer.apply_chat_template(self.chat_history, tokenize=False, add_generation_prompt=True)
+            prompt = self.build_prompt()
             inputs = self.tokenizer.encode(prompt, add_special_tokens=False, return_tensors="pt").to("cuda")
             outputs = self.model.generate(
                 input_ids=inputs, 
-                max_new_tokens=1536, 
+                max_new_tokens=self.max_new_tokens, 
                 do_sample=True, 
                 temperature=0.8,
                 top_k=50, 
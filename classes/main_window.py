@@ -1,13 +1,21 @@
 # classes/main_window.py
-import markdown
 import torch
 import gc
 from PyQt6.QtWidgets import QMainWindow, QTabWidget, QVBoxLayout, QWidget, QLabel, QApplication, QMessageBox
+from PyQt6.QtCore import Qt, QTimer, QDateTime, QTime
+from PyQt6.QtGui import QTextCursor
 
 # Local imports
-from config import DATABASE_PATH, BASE_MODEL_ID, ADAPTER_MODELS
+from config import (
+    DATABASE_PATH, BASE_MODEL_ID, ADAPTER_MODELS, SERVER_HOST, SERVER_PORT, SERVER_MAX_BATCH_SIZE, SERVER_LOG_TO_DB, SERVER_MAX_NEW_TOKENS,
+    PREVIEW_DEBOUNCE_MS, PREVIEW_FIRST_PAGE_TURNS, PREVIEW_PAGE_TURNS, CHAT_PAGE_TURNS, CHAT_CONTEXT_TURNS,
+    MODEL_CACHE_DIR, MODEL_CACHE_MERGE_ADAPTERS
+)
 from .database_manager import DatabaseManager
 from .inference_workers import ModelLoaderThread, InferenceThread
+from .inference_server import InferenceServerThread
+from .preview_worker import PreviewLoaderThread
+from .bulk_worker import BulkOperationThread, ConversationSearchThread
 from .conversation_tab import ConversationTab
 from .chat_tab import ChatTab
 from .data_management_tab import DataManagementTab
@@ -24,8 +32,25 @@ class MainWindow(QMainWindow):
         self.chat_tokenizer = None
         self.chat_history = []
         self.current_chat_conv_db_id = None
+        self.server_thread = None
         self.is_metadata_locked = False
 
+        # Preview panes load off-thread; the Data Collection pane shows the newest turns first.
+        self.mgmt_preview_loader = PreviewLoaderThread(self.db, False, PREVIEW_FIRST_PAGE_TURNS, PREVIEW_PAGE_TURNS)
+        self.conv_preview_loader = PreviewLoaderThread(self.db, True, PREVIEW_FIRST_PAGE_TURNS, PREVIEW_PAGE_TURNS)
+        self.mgmt_preview_request_id = None
+        self.mgmt_preview_conv_id = None
+        self.conv_preview_request_id = None
+        self.pending_conv_preview_id = None
+        self.mgmt_preview_timer = QTimer(self)
+        self.mgmt_preview_timer.setSingleShot(True)
+        self.mgmt_preview_timer.setInterval(PREVIEW_DEBOUNCE_MS)
+        self.conv_preview_timer = QTimer(self)
+        self.conv_preview_timer.setSingleShot(True)
+        self.conv_preview_timer.setInterval(PREVIEW_DEBOUNCE_MS)
+        self.bulk_search_loader = ConversationSearchThread(self.db)
+        self.bulk_search_request_id = None
+
         self.tabs = QTabWidget()
         self.chat_tab = ChatTab()
         self.conv_tab = ConversationTab()
@@ -48,12 +73,20 @@ class MainWindow(QMainWindow):
         self.setCentralWidget(central_widget)
         
         self.connect_signals()
+        self.mgmt_preview_loader.start()
+        self.conv_preview_loader.start()
+        self.bulk_search_loader.start()
         self.initialize_ui_state()
         
         self.tabs.setCurrentWidget(self.chat_tab)
 
     def connect_signals(self):
         self.tabs.currentChanged.connect(self.on_tab_changed)
+        self.mgmt_preview_timer.timeout.connect(self.request_mgmt_preview)
+        self.mgmt_preview_loader.page_ready.connect(self.on_mgmt_preview_page)
+        self.conv_preview_timer.timeout.connect(self.request_conv_preview)
+        self.conv_preview_loader.page_ready.connect(self.on_conv_preview_page)
+        self.bulk_search_loader.results_ready.connect(self.on_bulk_list_ready)
         
         # Data Collection Tab
         self.conv_tab.model_combo.currentIndexChanged.connect(self.update_conversation_dropdown)
@@ -66,15 +99,34 @@ class MainWindow(QMainWindow):
 
         # Chat Tab
         self.chat_tab.load_model_button.clicked.connect(self.load_selected_model)
+        self.chat_tab.server_button.clicked.connect(self.toggle_inference_server)
         self.chat_tab.create_button.clicked.connect(self.create_new_chat_conversation)
         self.chat_tab.conv_combo.currentIndexChanged.connect(self.load_chat_history)
         self.chat_tab.send_button.clicked.connect(self.send_chat_message)
         self.chat_tab.input_line.sendMessage.connect(self.send_chat_message)
+        self.chat_tab.history_display.olderRequested.connect(self.load_older_chat_turns)
+        self.chat_tab.history_display.newerRequested.connect(self.load_newer_chat_turns)
 
         # Data Management Tab
         self.mgmt_tab.model_filter_combo.currentIndexChanged.connect(self.populate_delete_dropdown)
+        self.mgmt_tab.model_filter_combo.currentIndexChanged.connect(self.populate_bulk_list)
         self.mgmt_tab.delete_combo.currentIndexChanged.connect(self.update_mgmt_preview)
         self.mgmt_tab.delete_button.clicked.connect(self.delete_selected_conversation)
+        self.mgmt_tab.apply_filters_button.clicked.connect(self.populate_bulk_list)
+        self.mgmt_tab.search_input.returnPressed.connect(self.populate_bulk_list)
+        self.mgmt_tab.bulk_list.selectionModel().currentChanged.connect(self.on_bulk_current_changed)
+        self.mgmt_tab.bulk_list.selectionModel().selectionChanged.connect(self.update_bulk_count)
+        self.mgmt_tab.select_all_button.clicked.connect(self.mgmt_tab.bulk_list.selectAll)
+        self.mgmt_tab.bulk_delete_button.clicked.connect(self.bulk_delete_selected)
+        self.mgmt_tab.reassign_button.clicked.connect(self.bulk_reassign_selected)
+        self.mgmt_tab.undo_button.clicked.connect(self.undo_last_bulk_operation)
+
+    def closeEvent(self, event):
+        self.stop_inference_server()
+        self.mgmt_preview_loader.stop()
+        self.conv_preview_loader.stop()
+        self.bulk_search_loader.stop()
+        super().closeEvent(event)
 
     def on_tab_changed(self, index):
         if self.tabs.widget(index) == self.mgmt_tab:
@@ -82,6 +134,9 @@ class MainWindow(QMainWindow):
 
     # --- Data Management Methods ---
     def populate_mgmt_model_filter(self):
+        # Rebuilding the combos must not reset the user's filter or the model they typed to reassign to.
+        selected_model = self.mgmt_tab.model_filter_combo.currentText()
+        reassign_text = self.mgmt_tab.reassign_model_combo.currentText()
         self.mgmt_tab.model_filter_combo.blockSignals(True)
         self.mgmt_tab.model_filter_combo.clear()
         self.mgmt_tab.model_filter_combo.addItem("All Models")
@@ -89,8 +144,15 @@ class MainWindow(QMainWindow):
         if models:
             for row in models:
                 self.mgmt_tab.model_filter_combo.addItem(row[0])
+        self.mgmt_tab.model_filter_combo.setCurrentIndex(max(self.mgmt_tab.model_filter_combo.findText(selected_model), 0))
         self.mgmt_tab.model_filter_combo.blockSignals(False)
+        self.mgmt_tab.reassign_model_combo.clear()
+        if models:
+            for row in models:
+                self.mgmt_tab.reassign_model_combo.addItem(row[0])
+        self.mgmt_tab.reassign_model_combo.setEditText(reassign_text)
         self.populate_delete_dropdown()
+        self.populate_bulk_list()
 
     def populate_delete_dropdown(self):
         self.mgmt_tab.delete_combo.blockSignals(True)
@@ -121,25 +183,134 @@ class MainWindow(QMainWindow):
             self.db.delete_conversation(conv_db_id)
             self.status_label.setText(f"Status: Deleted conversation '{conv_summary}'.")
             self.populate_delete_dropdown()
+            self.populate_bulk_list()
             self.populate_models_dropdown()
             if self.chat_model:
                 self.populate_chat_conversations()
 
     def update_mgmt_preview(self):
-        conv_db_id = self.mgmt_tab.delete_combo.currentData()
+        self.show_mgmt_preview(self.mgmt_tab.delete_combo.currentData())
+
+    def show_mgmt_preview(self, conv_db_id):
+        # Drop any in-flight load right away, but only start a new one once the selection settles.
+        self.mgmt_preview_request_id = None
+        self.mgmt_preview_loader.cancel()
+        self.mgmt_preview_conv_id = conv_db_id
         if not conv_db_id:
+            self.mgmt_preview_timer.stop()
             self.mgmt_tab.preview_pane.clear()
             return
-        turns = self.db.get_conversation_turns(conv_db_id)
-        preview_html = ""
-        if turns:
-            for user_prompt, assistant_response in turns:
-                user_html = markdown.markdown(user_prompt)
-                assistant_html = markdown.markdown(assistant_response)
-                preview_html += f"<p><b style='color:#D3D3D3;'>User:</b><br>{user_html}</p>"
-                preview_html += f"<p><b style='color:#00AACC;'>AI:</b><br>{assistant_html}</p><hr>"
-        self.mgmt_tab.preview_pane.setHtml(preview_html)
-        self.mgmt_tab.preview_pane.verticalScrollBar().setValue(0)
+        self.mgmt_preview_timer.start()
+
+    def request_mgmt_preview(self):
+        if self.mgmt_preview_conv_id:
+            self.mgmt_preview_request_id = self.mgmt_preview_loader.request(self.mgmt_preview_conv_id)
+
+    def on_mgmt_preview_page(self, request_id, html, is_first_page, is_last_page):
+        if request_id != self.mgmt_preview_request_id:
+            return
+        pane = self.mgmt_tab.preview_pane
+        if is_first_page:
+            pane.setHtml(html)
+            pane.verticalScrollBar().setValue(0)
+        else:
+            cursor = QTextCursor(pane.document())
+            cursor.movePosition(QTextCursor.MoveOperation.End)
+            cursor.insertHtml(html)
+
+    # --- Bulk Curation Methods ---
+    def populate_bulk_list(self):
+        tab = self.mgmt_tab
+        selected_model = tab.model_filter_combo.currentText()
+        date_from = date_to = None
+        if tab.date_filter_check.isChecked():
+            date_from = QDateTime(tab.date_from_edit.date(), QTime(0, 0)).toSecsSinceEpoch()
+            date_to = QDateTime(tab.date_to_edit.date().addDays(1), QTime(0, 0)).toSecsSinceEpoch()
+        filters = {
+            "model_name": None if selected_model in ("", "All Models") else selected_model,
+            "date_from": date_from,
+            "date_to": date_to,
+            "min_turns": tab.min_turns_spin.value() or None,
+            "max_turns": tab.max_turns_spin.value() or None,
+            "search": tab.search_input.text().strip() or None,
+        }
+        tab.bulk_count_label.setText("Searching...")
+        self.bulk_search_request_id = self.bulk_search_loader.request(filters)
+
+    def on_bulk_list_ready(self, request_id, rows):
+        if request_id != self.bulk_search_request_id:
+            return
+        self.mgmt_tab.bulk_model.set_rows(rows)
+        self.update_bulk_count()
+
+    def update_bulk_count(self):
+        selected = len(self.mgmt_tab.bulk_list.selectionModel().selectedRows())
+        self.mgmt_tab.bulk_count_label.setText(f"{self.mgmt_tab.bulk_model.rowCount()} conversations, {selected} selected")
+
+    def on_bulk_current_changed(self, current, previous):
+        self.show_mgmt_preview(current.data(Qt.ItemDataRole.UserRole) if current.isValid() else None)
+
+    def selected_bulk_ids(self):
+        return [index.data(Qt.ItemDataRole.UserRole) for index in self.mgmt_tab.bulk_list.selectionModel().selectedRows()]
+
+    def bulk_delete_selected(self):
+        conv_db_ids = self.selected_bulk_ids()
+        if not conv_db_ids:
+            self.status_label.setText("Status: No conversations selected for bulk delete.")
+            return
+        reply = QMessageBox.question(self, 'Confirm Bulk Deletion',
+                                     f"Permanently delete {len(conv_db_ids)} conversation(s) and all of their turns?\n\n"
+                                     "This can be reverted with 'Undo Last Bulk Operation'.",
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
+        if reply == QMessageBox.StandardButton.Yes:
+            self.start_bulk_operation(BulkOperationThread(self.db, "delete", conv_db_ids=conv_db_ids))
+
+    def bulk_reassign_selected(self):
+        conv_db_ids = self.selected_bulk_ids()
+        new_model = self.mgmt_tab.reassign_model_combo.currentText().strip()
+        if not conv_db_ids or not new_model:
+            self.status_label.setText("Status: Select conversations and enter a source model to reassign them to.")
+            return
+        self.start_bulk_operation(BulkOperationThread(self.db, "reassign", conv_db_ids=conv_db_ids, new_model=new_model))
+
+    def undo_last_bulk_operation(self):
+        entry = self.db.get_latest_undo_entry()
+        if not entry:
+            self.status_label.setText("Status: Nothing to undo.")
+            return
+        journal_id, _, description = entry
+        reply = QMessageBox.question(self, 'Confirm Undo', f"Undo the last bulk operation?\n\n{description}",
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
+        if reply == QMessageBox.StandardButton.Yes:
+            self.start_bulk_operation(BulkOperationThread(self.db, "undo", journal_id=journal_id))
+
+    def start_bulk_operation(self, thread):
+        self.mgmt_tab.set_bulk_controls_enabled(False)
+        self.mgmt_tab.bulk_progress.setValue(0)
+        self.mgmt_tab.bulk_progress.setVisible(True)
+        self.bulk_thread = thread
+        self.bulk_thread.progress.connect(self.on_bulk_progress)
+        self.bulk_thread.finished.connect(self.on_bulk_operation_finished)
+        self.bulk_thread.error.connect(self.on_bulk_operation_error)
+        self.bulk_thread.start()
+
+    def on_bulk_progress(self, percent, message):
+        self.mgmt_tab.bulk_progress.setValue(percent)
+        self.status_label.setText(f"Status: {message}")
+
+    def on_bulk_operation_finished(self, message):
+        self.mgmt_tab.bulk_progress.setVisible(False)
+        self.mgmt_tab.set_bulk_controls_enabled(True)
+        self.status_label.setText(f"Status: {message}")
+        self.populate_mgmt_model_filter()
+        self.populate_models_dropdown()
+        if self.chat_model:
+            self.populate_chat_conversations()
+
+    def on_bulk_operation_error(self, error_message):
+        self.mgmt_tab.bulk_progress.setVisible(False)
+        self.mgmt_tab.set_bulk_controls_enabled(True)
+        self.status_label.setText(f"Status: Error - {error_message}")
 
     # --- Shared & Data Collection Methods ---
     def initialize_ui_state(self):
@@ -190,7 +361,7 @@ class MainWindow(QMainWindow):
         self.conv_tab.edit_button.setText("Unlock / Edit Metadata")
         if index <= 0:
             self.conv_tab.edit_button.setEnabled(False)
-            self.conv_tab.preview_pane.clear()
+            self.update_preview_pane(None)
             self.conv_tab.conv_id_display.clear()
             if self.conv_tab.model_combo.currentIndex() > 0:
                  self.lock_metadata(False)
@@ -207,19 +378,34 @@ class MainWindow(QMainWindow):
             self.status_label.setText(f"Status: Loaded '{conv_id_str}'.")
 
     def update_preview_pane(self, conversation_db_id):
+        self.conv_preview_request_id = None
+        self.conv_preview_loader.cancel()
         if not conversation_db_id:
+            self.conv_preview_timer.stop()
             self.conv_tab.preview_pane.clear()
             return
-        turns = self.db.get_conversation_turns(conversation_db_id)
-        preview_html = ""
-        if turns:
-            for user_prompt, assistant_response in turns:
-                user_html = markdown.markdown(user_prompt)
-                assistant_html = markdown.markdown(assistant_response)
-                preview_html += f"<p><b style='color:#D3D3D3;'>User:</b><br>{user_html}</p>"
-                preview_html += f"<p><b style='color:#00AACC;'>AI:</b><br>{assistant_html}</p><hr>"
-        self.conv_tab.preview_pane.setHtml(preview_html)
-        self.conv_tab.preview_pane.verticalScrollBar().setValue(self.conv_tab.preview_pane.verticalScrollBar().maximum())
+        self.pending_conv_preview_id = conversation_db_id
+        self.conv_preview_timer.start()
+
+    def request_conv_preview(self):
+        if self.pending_conv_preview_id:
+            self.conv_preview_request_id = self.conv_preview_loader.request(self.pending_conv_preview_id)
+
+    def on_conv_preview_page(self, request_id, html, is_first_page, is_last_page):
+        if request_id != self.conv_preview_request_id:
+            return
+        pane = self.conv_tab.preview_pane
+        scroll_bar = pane.verticalScrollBar()
+        if is_first_page:
+            pane.setHtml(html)
+            scroll_bar.setValue(scroll_bar.maximum())
+        else:
+            # Older turns go above the current content; keep the view anchored to the bottom.
+            distance_from_bottom = scroll_bar.maximum() - scroll_bar.value()
+            cursor = QTextCursor(pane.document())
+            cursor.movePosition(QTextCursor.MoveOperation.Start)
+            cursor.insertHtml(html)
+            scroll_bar.setValue(scroll_bar.maximum() - distance_from_bottom)
 
     def lock_metadata(self, lock=True):
         self.conv_tab.summary_input.setReadOnly(lock)
@@ -237,7 +423,7 @@ class MainWindow(QMainWindow):
         self.conv_tab.conv_id_display.clear()
         self.conv_tab.user_prompt_input.clear()
         self.conv_tab.assistant_response_input.clear()
-        self.conv_tab.preview_pane.clear()
+        self.update_preview_pane(None)
         self.status_label.setText("Status: Ready for new conversation.")
     
     def toggle_edit_mode(self):
@@ -310,6 +496,7 @@ class MainWindow(QMainWindow):
 
     # --- Chat Tab Methods ---
     def unload_model(self):
+        self.stop_inference_server()
         if self.chat_model is not None:
             self.chat_tab.status_label.setText("Unloading previous model...")
             QApplication.processEvents()
@@ -327,8 +514,10 @@ class MainWindow(QMainWindow):
         model_data = self.chat_tab.model_combo.currentData()
         self.chat_tab.status_label.setText(f"Loading {self.chat_tab.model_combo.currentText()}...")
         self.chat_tab.load_model_button.setEnabled(False)
+        self.chat_tab.server_button.setEnabled(False)
         self.chat_tab.send_button.setEnabled(False)
-        self.model_loader_thread = ModelLoaderThread(model_data["id"], model_data["adapter"])
+        self.model_loader_thread = ModelLoaderThread(model_data["id"], model_data["adapter"], MODEL_CACHE_DIR, MODEL_CACHE_MERGE_ADAPTERS)
+        self.model_loader_thread.progress.connect(self.on_model_load_progress)
         self.model_loader_thread.finished.connect(self.on_model_load_finished)
         self.model_loader_thread.error.connect(self.on_model_load_error)
         self.model_loader_thread.start()
@@ -338,12 +527,55 @@ class MainWindow(QMainWindow):
         self.chat_tokenizer = tokenizer
         self.chat_tab.status_label.setText(f"Loaded: {self.chat_tab.model_combo.currentText()}")
         self.chat_tab.load_model_button.setEnabled(True)
+        self.chat_tab.server_button.setEnabled(True)
         self.populate_chat_conversations()
 
+    def on_model_load_progress(self, message):
+        self.chat_tab.status_label.setText(f"{self.chat_tab.model_combo.currentText()}: {message}")
+
     def on_model_load_error(self, error_message):
         self.chat_tab.status_label.setText(f"Error: {error_message}")
         self.chat_tab.load_model_button.setEnabled(True)
     
+    def toggle_inference_server(self):
+        if self.server_thread is not None:
+            self.stop_inference_server()
+            self.status_label.setText("Status: API server stopped.")
+            return
+        if not self.chat_model:
+            self.status_label.setText("Status: Load a model first.")
+            return
+        model_name = self.chat_tab.model_combo.currentData()["name"]
+        db = self.db if SERVER_LOG_TO_DB else None
+        self.server_thread = InferenceServerThread(self.chat_model, self.chat_tokenizer, model_name, SERVER_HOST, SERVER_PORT, SERVER_MAX_BATCH_SIZE, db, SERVER_MAX_NEW_TOKENS)
+        self.server_thread.started_serving.connect(self.on_server_started)
+        self.server_thread.error.connect(self.on_server_error)
+        self.server_thread.start()
+        self.chat_tab.server_button.setText("Stop API Server")
+        # The server's scheduler owns the model while it runs; a concurrent chat generate would double peak VRAM.
+        self.chat_tab.load_model_button.setEnabled(False)
+        self.chat_tab.send_button.setEnabled(False)
+
+    def stop_inference_server(self):
+        if self.server_thread is None:
+            return
+        self.server_thread.stop()
+        self.server_thread.wait()
+        self.on_server_stopped()
+
+    def on_server_stopped(self):
+        self.server_thread = None
+        self.chat_tab.server_button.setText("Start API Server")
+        self.chat_tab.load_model_button.setEnabled(True)
+        self.set_chat_send_enabled(self.current_chat_conv_db_id is not None)
+
+    def on_server_started(self, url):
+        self.status_label.setText(f"Status: API server listening at {url}")
+
+    def on_server_error(self, error_message):
+        self.on_server_stopped()
+        self.status_label.setText(f"Status: API server error - {error_message}")
+
     def populate_chat_conversations(self):
         self.chat_tab.conv_combo.blockSignals(True)
         self.chat_tab.conv_combo.clear()
@@ -380,20 +612,23 @@ class MainWindow(QMainWindow):
                 self.chat_tab.conv_combo.setCurrentIndex(i)
                 break
         self.populate_models_dropdown()
-        self.chat_tab.send_button.setEnabled(True)
+        self.set_chat_send_enabled(True)
         self.status_label.setText(f"Status: Created new chat '{conv_id_str}'. Ready for inference.")
-        self.chat_tab.history_display.setHtml(f"<p><i>New chat session '{summary}' started.</i></p>")
+        self.chat_tab.history_display.show_note(f"New chat session '{summary}' started.")
 
     def send_chat_message(self):
         user_text = self.chat_tab.input_line.toPlainText().strip()
-        if not user_text or not self.chat_model or self.current_chat_conv_db_id is None:
+        if not user_text or not self.chat_model or self.current_chat_conv_db_id is None or self.server_thread is not None:
             return
-        user_html = markdown.markdown(user_text)
         self.chat_history.append({"role": "user", "content": user_text})
-        self.chat_tab.history_display.append(f"<p><b style='color:#D3D3D3;'>You:</b><br>{user_html}</p>")
+        self.trim_chat_history()
+        if self.chat_tab.history_display.has_newer:
+            self.show_latest_chat_turns()
+        self.chat_tab.history_display.append_message("user", user_text)
         self.chat_tab.input_line.clear()
         self.chat_tab.status_label.setText("AI is thinking...")
         self.chat_tab.send_button.setEnabled(False)
+        self.chat_tab.server_button.setEnabled(False)
         self.inference_thread = InferenceThread(self.chat_model, self.chat_tokenizer, self.chat_history)
         self.inference_thread.finished.connect(self.on_inference_finished)
         self.inference_thread.error.connect(self.on_inference_error)
@@ -401,17 +636,25 @@ class MainWindow(QMainWindow):
 
     def on_inference_finished(self, response_text):
         self.chat_history.append({"role": "assistant", "content": response_text})
-        assistant_html = markdown.markdown(response_text)
-        self.chat_tab.history_display.append(f"<p><b style='color:#00AACC;'>AI:</b><br>{assistant_html}</p><hr>")
         user_prompt = self.chat_history[-2]['content']
+        self.trim_chat_history()
         self.db.save_turn(self.current_chat_conv_db_id, user_prompt, response_text)
+        if self.chat_tab.history_display.has_newer:
+            # The window moved away from the end while generating; reload it with the saved turn.
+            self.show_latest_chat_turns()
+        else:
+            self.chat_tab.history_display.append_message("assistant", response_text)
         self.chat_tab.status_label.setText(f"Loaded: {self.chat_tab.model_combo.currentText()}")
-        self.chat_tab.send_button.setEnabled(True)
+        self.chat_tab.server_button.setEnabled(True)
+        self.set_chat_send_enabled(True)
 
     def on_inference_error(self, error_message):
-        self.chat_tab.history_display.append(f"<p><i>Error during generation: {error_message}</i></p>")
+        if self.chat_tab.history_display.has_newer:
+            self.show_latest_chat_turns()
+        self.chat_tab.history_display.append_message("note", f"Error during generation: {error_message}")
         self.chat_tab.status_label.setText(f"Loaded: {self.chat_tab.model_combo.currentText()}")
-        self.chat_tab.send_button.setEnabled(True)
+        self.chat_tab.server_button.setEnabled(True)
+        self.set_chat_send_enabled(True)
         
     def load_chat_history(self, index):
         if index <= 0:
@@ -419,24 +662,49 @@ class MainWindow(QMainWindow):
             return
         self.current_chat_conv_db_id = self.chat_tab.conv_combo.itemData(index)
         self.chat_history.clear()
-        turns = self.db.get_conversation_turns(self.current_chat_conv_db_id)
-        history_html = ""
-        if turns:
-            for user_prompt, assistant_response in turns:
-                user_html = markdown.markdown(user_prompt)
-                assistant_html = markdown.markdown(assistant_response)
-                self.chat_history.append({"role": "user", "content": user_prompt})
-                self.chat_history.append({"role": "assistant", "content": assistant_response})
-                history_html += f"<p><b style='color:#D3D3D3;'>You:</b><br>{user_html}</p>"
-                history_html += f"<p><b style='color:#00AACC;'>AI:</b><br>{assistant_html}</p><hr>"
-        self.chat_tab.history_display.setHtml(history_html)
+        # Only the newest turns are kept as model context; InferenceThread trims them further to fit the model.
+        rows = self.db.get_conversation_turns_page(self.current_chat_conv_db_id, CHAT_CONTEXT_TURNS, newest_first=True) or []
+        for _, _, user_prompt, assistant_response in reversed(rows):
+            self.chat_history.append({"role": "user", "content": user_prompt})
+            self.chat_history.append({"role": "assistant", "content": assistant_response})
+        self.show_latest_chat_turns()
         self.chat_tab.summary_input.setText(self.chat_tab.conv_combo.currentText())
-        self.chat_tab.send_button.setEnabled(True)
+        self.set_chat_send_enabled(True)
+
+    def trim_chat_history(self):
+        """Drops whole turns from the front so chat_history holds at most CHAT_CONTEXT_TURNS turns."""
+        excess = len(self.chat_history) - 2 * CHAT_CONTEXT_TURNS
+        if excess > 0:
+            del self.chat_history[:excess + excess % 2]
+
+    def show_latest_chat_turns(self):
+        rows = self.db.get_conversation_turns_page(self.current_chat_conv_db_id, CHAT_PAGE_TURNS, newest_first=True) or []
+        self.chat_tab.history_display.set_turns(list(reversed(rows)), has_older=len(rows) == CHAT_PAGE_TURNS)
+
+    def load_older_chat_turns(self):
+        view = self.chat_tab.history_display
+        oldest_key = view.oldest_key()
+        rows = []
+        if self.current_chat_conv_db_id is not None and oldest_key is not None:
+            rows = self.db.get_conversation_turns_page(self.current_chat_conv_db_id, CHAT_PAGE_TURNS, oldest_key, newest_first=True) or []
+        view.prepend_turns(list(reversed(rows)), has_older=len(rows) == CHAT_PAGE_TURNS)
+
+    def load_newer_chat_turns(self):
+        view = self.chat_tab.history_display
+        newest_key = view.newest_key()
+        rows = []
+        if self.current_chat_conv_db_id is not None and newest_key is not None:
+            rows = self.db.get_conversation_turns_page(self.current_chat_conv_db_id, CHAT_PAGE_TURNS, newest_key) or []
+        view.append_turns(rows, has_newer=len(rows) == CHAT_PAGE_TURNS)
+
+    def set_chat_send_enabled(self, enabled):
+        """Send stays disabled while the API server is running on the loaded model."""
+        self.chat_tab.send_button.setEnabled(enabled and self.server_thread is None)
 
     def start_new_chat(self):
         self.current_chat_conv_db_id = None
         self.chat_history.clear()
-        self.chat_tab.history_display.setHtml("<p><i>Load an existing session or create a new one to begin.</i></p>")
+        self.chat_tab.history_display.show_note("Load an existing session or create a new one to begin.")
         self.chat_tab.summary_input.clear()
         if self.chat_tab.conv_combo.count() > 0:
             self.chat_tab.conv_combo.setCurrentIndex(0)
@@ -0,0 +1,115 @@
+# classes/model_cache.py
+# On-disk cache of prepared (quantized, optionally adapter-merged) model weights.
+import hashlib
+import json
+import os
+import shutil
+import time
+
+MANIFEST_NAME = "convoforge_cache.json"
+
+def adapter_digest(adapter_path):
+    """Hashes every file in an adapter directory so retrained adapters get a new cache entry."""
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(adapter_path):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            digest.update(os.path.relpath(file_path, adapter_path).encode("utf-8"))
+            with open(file_path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+    return digest.hexdigest()
+
+def base_model_digest(model_id):
+    """
+    Identifies the exact base weights: a digest of file names, sizes and mtimes for a local
+    directory, or the resolved commit of a Hub repo (the cached refs/main when offline).
+    Returns None when neither can be determined.
+    """
+    if os.path.isdir(model_id):
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(model_id):
+            dirs.sort()
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                stat = os.stat(file_path)
+                digest.update(f"{os.path.relpath(file_path, model_id)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode("utf-8"))
+        return digest.hexdigest()
+    from huggingface_hub import HfApi
+    from huggingface_hub.constants import HF_HUB_CACHE, HF_HUB_OFFLINE
+    if not HF_HUB_OFFLINE:
+        try:
+            return HfApi().model_info(model_id).sha
+        except Exception:
+            pass
+    ref_path = os.path.join(HF_HUB_CACHE, f"models--{model_id.replace('/', '--')}", "refs", "main")
+    if os.path.exists(ref_path):
+        with open(ref_path, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    return None
+
+class PreparedModelCache:
+    """
+    Stores prepared models as safetensors directories under `cache_dir`, one per key.
+
+    A key covers everything that changes the prepared weights: base model ID and revision,
+    adapter path and content hash (when merged), quantization config and library versions.
+    Entries are written to a temporary directory and renamed into place, and only count as
+    present once their manifest exists, so an interrupted save is never loaded. Storing an
+    entry removes the ones it supersedes (same model and adapter, any other key).
+    """
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def make_key(self, model_id, base_revision, quant_config, adapter_path=None, adapter_hash=None, library_versions=None):
+        description = {
+            "model_id": model_id,
+            "base_revision": base_revision,
+            "adapter_path": os.path.abspath(adapter_path) if adapter_path else None,
+            "adapter_hash": adapter_hash,
+            "quant_config": quant_config,
+            "library_versions": library_versions or {},
+        }
+        key = hashlib.sha256(json.dumps(description, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        return key, description
+
+    def entry_path(self, model_id, key):
+        safe_name = model_id.replace("/", "--")
+        return os.path.join(self.cache_dir, f"{safe_name}-{key[:16]}")
+
+    def lookup(self, model_id, key):
+        path = self.entry_path(model_id, key)
+        return path if os.path.exists(os.path.join(path, MANIFEST_NAME)) else None
+
+    def store(self, model_id, key, description, model, tokenizer):
+        """Saves the model and tokenizer as an entry and returns its path."""
+        path = self.entry_path(model_id, key)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        try:
+            model.save_pretrained(tmp_path, safe_serialization=True)
+            tokenizer.save_pretrained(tmp_path)
+            with open(os.path.join(tmp_path, MANIFEST_NAME), "w", encoding="utf-8") as f:
+                json.dump({"key": key, "created_at": time.time(), **description}, f, indent=2, default=str)
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp_path, path)
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        self.prune(key, description)
+        return path
+
+    def prune(self, key, description):
+        """Deletes entries for the same model and adapter under any other key, e.g. left behind by a library upgrade."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            manifest_path = os.path.join(self.cache_dir, name, MANIFEST_NAME)
+            try:
+                with open(manifest_path, "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if (manifest.get("key") != key and manifest.get("model_id") == description["model_id"]
+                    and manifest.get("adapter_path") == description["adapter_path"]):
+                shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
@@ -0,0 +1,92 @@
+# classes/preview_worker.py
+import threading
+import markdown
+from PyQt6.QtCore import QThread, pyqtSignal
+
+def render_turns_html(turns, user_label="User"):
+    """Renders (user_prompt, assistant_response) pairs as the HTML used by the preview and chat panes."""
+    html = ""
+    for user_prompt, assistant_response in turns:
+        user_html = markdown.markdown(user_prompt)
+        assistant_html = markdown.markdown(assistant_response)
+        html += f"<p><b style='color:#D3D3D3;'>{user_label}:</b><br>{user_html}</p>"
+        html += f"<p><b style='color:#00AACC;'>AI:</b><br>{assistant_html}</p><hr>"
+    return html
+
+class PreviewLoaderThread(QThread):
+    """
+    Loads and renders conversation previews off the GUI thread.
+
+    Only the most recent request is kept: a new request replaces any pending one and
+    makes the page currently being loaded stale, so the worker stops at the next page
+    boundary. Pages are emitted as they are rendered, the first one kept small so the
+    first screen appears immediately.
+    """
+    # request_id, html, is_first_page, is_last_page
+    page_ready = pyqtSignal(int, str, bool, bool)
+
+    def __init__(self, db, newest_first=False, first_page_size=20, page_size=100):
+        super().__init__()
+        self.db = db
+        self.newest_first = newest_first
+        self.first_page_size = first_page_size
+        self.page_size = page_size
+        self._condition = threading.Condition()
+        self._pending = None
+        self._latest_id = 0
+        self._running = True
+
+    def request(self, conv_db_id):
+        """Queues a preview load, superseding any earlier one, and returns its request id."""
+        with self._condition:
+            self._latest_id += 1
+            self._pending = (self._latest_id, conv_db_id)
+            self._condition.notify()
+            return self._latest_id
+
+    def cancel(self):
+        """Drops the pending request and stops the one in progress."""
+        with self._condition:
+            self._latest_id += 1
+            self._pending = None
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._latest_id += 1
+            self._condition.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and self._running:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                request_id, conv_db_id = self._pending
+                self._pending = None
+            self._load(request_id, conv_db_id)
+
+    def _is_stale(self, request_id):
+        return request_id != self._latest_id
+
+    def _load(self, request_id, conv_db_id):
+        after_key = None
+        limit = self.first_page_size
+        is_first = True
+        while not self._is_stale(request_id):
+            rows = self.db.get_conversation_turns_page(conv_db_id, limit, after_key, self.newest_first) or []
+            is_last = len(rows) < limit
+            turns = [(user_prompt, assistant_response) for _, _, user_prompt, assistant_response in rows]
+            if self.newest_first:
+                turns.reverse()
+            html = render_turns_html(turns)
+            if self._is_stale(request_id):
+                return
+            self.page_ready.emit(request_id, html, is_first, is_last)
+            if is_last:
+                return
+            after_key = (rows[-1][0], rows[-1][1])
+            limit = self.page_size
+            is_first = False
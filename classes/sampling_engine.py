@@ -0,0 +1,144 @@
+# classes/sampling_engine.py
+# Deterministic train/eval splitting and down-sampling over the conversation database.
+import hashlib
+import heapq
+import json
+
+def stable_fraction(seed, purpose, key):
+    """Maps (seed, purpose, key) to a uniform float in [0, 1) that never changes between runs."""
+    digest = hashlib.blake2b(f"{seed}:{purpose}:{key}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2**64
+
+def length_band(char_count, band_edges):
+    """Returns a label such as '<2000', '2000-8000' or '>=32000' for the band containing char_count."""
+    lower = None
+    for edge in band_edges:
+        if char_count < edge:
+            return f"<{edge}" if lower is None else f"{lower}-{edge}"
+        lower = edge
+    return f">={lower}" if lower is not None else "all"
+
+class SamplingEngine:
+    """
+    Builds stratified, reproducible train/eval splits over streaming cursors.
+
+    A conversation goes to eval when a stable hash of its conversation ID falls below
+    eval_fraction. The decision depends on nothing else, so adding data or moving a
+    conversation to another stratum never moves it between train and eval. Each stratum
+    (source model x length band) gets its share in expectation. A per-model cap is split
+    across that model's strata in proportion to their size and filled with the lowest
+    sampling hashes, kept in bounded heaps (a deterministic reservoir).
+
+    Without a cap the split is a single streaming pass. With one, a first pass counts
+    strata and memory is bounded by the capped sample.
+    """
+    def __init__(self, db, seed="convoforge"):
+        self.db = db
+        self.seed = seed
+
+    def build_split(self, split_name, eval_fraction=0.1, max_per_model=None, length_bands=(), exclude=(), models=None, progress_callback=None):
+        """Computes and stores split `split_name`. Returns the number of conversations assigned."""
+        params = {
+            "seed": self.seed,
+            "eval_fraction": eval_fraction,
+            "max_per_model": max_per_model,
+            "length_bands": sorted(length_bands),
+            "exclude": sorted(exclude),
+            "models": sorted(models) if models else None,
+        }
+        return self.db.save_split(split_name, params, lambda con: self._assign(params, con, progress_callback))
+
+    def refresh_split(self, split_name, progress_callback=None):
+        """Recomputes a stored split with its original parameters, e.g. after new data was added."""
+        params = self.db.get_split_definition(split_name)
+        if params is None:
+            return None
+        self.seed = params["seed"]
+        return self.build_split(split_name, params["eval_fraction"], params["max_per_model"], params["length_bands"],
+                                params["exclude"], params["models"], progress_callback)
+
+    def _iter_candidates(self, params, con, progress_callback=None):
+        """Streams (conversation_db_id, conv_id_str, source_model, stratum) for conversations eligible for the split."""
+        excluded = set(params["exclude"])
+        models = set(params["models"]) if params["models"] else None
+        seen = 0
+        for conv_db_id, conv_id_str, source_model, turn_count, char_count in self.db.iter_conversation_lengths(con=con):
+            seen += 1
+            if progress_callback and seen % 10000 == 0:
+                progress_callback(seen)
+            if turn_count == 0 or conv_id_str in excluded or (models is not None and source_model not in models):
+                continue
+            yield conv_db_id, conv_id_str, source_model, f"{source_model}|{length_band(char_count, params['length_bands'])}"
+
+    def _stratum_quotas(self, counts, stratum_models, cap):
+        """Returns {stratum: number kept}, dividing each model's cap across its strata by largest remainder."""
+        if not cap:
+            return dict(counts)
+        by_model = {}
+        for stratum in counts:
+            by_model.setdefault(stratum_models[stratum], []).append(stratum)
+        quotas = {}
+        for strata in by_model.values():
+            total = sum(counts[stratum] for stratum in strata)
+            if total <= cap:
+                quotas.update({stratum: counts[stratum] for stratum in strata})
+                continue
+            shares = {stratum: cap * counts[stratum] / total for stratum in strata}
+            for stratum in strata:
+                quotas[stratum] = int(shares[stratum])
+            leftover = cap - sum(quotas[stratum] for stratum in strata)
+            for stratum in sorted(strata, key=lambda name: (quotas[name] - shares[name], name))[:leftover]:
+                quotas[stratum] += 1
+        return quotas
+
+    def _assign(self, params, con, progress_callback=None):
+        """Yields (conversation_db_id, split, stratum) for the stored split, reading through `con`."""
+        seed, fraction, cap = params["seed"], params["eval_fraction"], params["max_per_model"]
+        side = lambda conv_id_str: "eval" if stable_fraction(seed, "split", conv_id_str) < fraction else "train"
+
+        if not cap:
+            for conv_db_id, conv_id_str, _, stratum in self._iter_candidates(params, con, progress_callback):
+                yield conv_db_id, side(conv_id_str), stratum
+            return
+
+        # Pass 1: stratum sizes, so each model's cap can be divided across its strata.
+        counts, stratum_models = {}, {}
+        for _, _, source_model, stratum in self._iter_candidates(params, con, progress_callback):
+            counts[stratum] = counts.get(stratum, 0) + 1
+            stratum_models[stratum] = source_model
+        kept = self._stratum_quotas(counts, stratum_models, cap)
+
+        # Pass 2: keep the lowest sampling hashes per stratum in bounded heaps (heapq is a min-heap, so store negatives).
+        heaps = {}
+        for conv_db_id, conv_id_str, _, stratum in self._iter_candidates(params, con):
+            limit = kept.get(stratum, 0)
+            if limit <= 0:
+                continue
+            heap = heaps.setdefault(stratum, [])
+            entry = (-stable_fraction(seed, "sample", conv_id_str), conv_db_id, conv_id_str)
+            if len(heap) < limit:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+
+        for stratum in sorted(heaps):
+            for _, conv_db_id, conv_id_str in sorted(heaps[stratum], key=lambda entry: entry[1]):
+                yield conv_db_id, side(conv_id_str), stratum
+
+    def export_split(self, split_name, split, output_path):
+        """Writes one side of a stored split as chat-format JSON Lines. Returns the number of conversations written."""
+        written = 0
+        current_id, messages = None, []
+        with open(output_path, "w", encoding="utf-8") as f:
+            for conv_id_str, user_prompt, assistant_response in self.db.iter_split_turns(split_name, split):
+                if conv_id_str != current_id and messages:
+                    f.write(json.dumps({"id": current_id, "messages": messages}) + "\n")
+                    written += 1
+                    messages = []
+                current_id = conv_id_str
+                messages.append({"role": "user", "content": user_prompt})
+                messages.append({"role": "assistant", "content": assistant_response})
+            if messages:
+                f.write(json.dumps({"id": current_id, "messages": messages}) + "\n")
+                written += 1
+        return written
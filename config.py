@@ -18,7 +18,41 @@ ADAPTER_MODELS = [
     }
 ]
 
+# --- Prepared Model Cache ---
+# After the first load, quantized weights are saved here as safetensors and reused on later loads.
+# Set MODEL_CACHE_DIR to None to always quantize from the original checkpoint.
+MODEL_CACHE_DIR = "./models/.prepared_cache"
+# Merge adapters into the cached weights. Faster to load, but uses one cache entry per adapter version.
+MODEL_CACHE_MERGE_ADAPTERS = False
+
+# --- Dataset Splits ---
+# Character-count boundaries of the length bands used to stratify train/eval splits.
+SPLIT_LENGTH_BANDS = [2000, 8000, 32000]
+SPLIT_EVAL_FRACTION = 0.1
+SPLIT_SEED = "convoforge"
+
+# --- Inference Server ---
+# OpenAI-compatible endpoint for the loaded model (python serve.py, or "Start API Server" in the Chat tab).
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8000
+SERVER_MAX_BATCH_SIZE = 8
+# Upper limit on max_tokens per request; larger requests are clamped to it.
+SERVER_MAX_NEW_TOKENS = 1536
+# Save every server exchange as a turn under a "<model>-server-NN" conversation.
+SERVER_LOG_TO_DB = True
+
 # --- UI Configuration ---
+# Preview panes load after the selection has been still for this long, then render page by page.
+PREVIEW_DEBOUNCE_MS = 150
+PREVIEW_FIRST_PAGE_TURNS = 20
+PREVIEW_PAGE_TURNS = 100
+# The Chat tab holds at most CHAT_WINDOW_TURNS turns, loading CHAT_PAGE_TURNS more at a time on scroll.
+CHAT_PAGE_TURNS = 30
+CHAT_WINDOW_TURNS = 120
+CHAT_RENDER_CACHE_SIZE = 300
+# The model sees at most the newest CHAT_CONTEXT_TURNS turns, further trimmed to fit its context window.
+CHAT_CONTEXT_TURNS = 50
+
 DARK_STYLESHEET = """
     QTabWidget::pane { border: 1px solid #555; }
     QTabBar::tab { background-color: #2B2B2B; color: #A9A9A9; padding: 10px 20px; border-top-left-radius: 4px; border-top-right-radius: 4px; }
@@ -26,7 +60,8 @@ DARK_STYLESHEET = """
     QWidget { background-color: #2B2B2B; color: #D3D3D3; font-size: 14px; }
     QMainWindow { background-color: #1E1E1E; }
     QLineEdit, QTextEdit, QComboBox { background-color: #3C3F41; border: 1px solid #555; border-radius: 4px; padding: 5px; color: #BBBBBB; }
-    QTextEdit#PreviewPane, QTextEdit#ChatHistory { background-color: #212121; }
+    QTextEdit#PreviewPane { background-color: #212121; }
+    QListView#ChatHistory { background-color: #212121; border: 1px solid #555; border-radius: 4px; }
     QLineEdit:read-only { background-color: #333333; }
     QPushButton { background-color: #007ACC; color: white; border: none; border-radius: 4px; padding: 8px 12px; }
     QPushButton:hover { background-color: #005A9E; }
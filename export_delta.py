@@ -0,0 +1,45 @@
+# export_delta.py
+# Incremental export and online snapshots for scheduled (e.g. nightly) pipelines.
+import sys
+import os
+import argparse
+
+# Local imports
+from config import DATABASE_PATH
+from classes.database_manager import DatabaseManager
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export ConvoForge changes since a watermark, or snapshot the live database.")
+    parser.add_argument("--since", type=int, help="Export changes after this watermark (overrides --state).")
+    parser.add_argument("--state", default="./databases/export_watermark.txt",
+                        help="File holding the last exported watermark; updated after a successful export.")
+    parser.add_argument("--out", help="JSON Lines file to write the delta to.")
+    parser.add_argument("--snapshot", help="Write a consistent copy of the live database to this path.")
+    return parser.parse_args()
+
+def read_watermark(state_path):
+    if not os.path.exists(state_path):
+        return 0
+    with open(state_path, "r", encoding="utf-8") as f:
+        return int(f.read().strip() or 0)
+
+if __name__ == '__main__':
+    args = parse_args()
+    if not args.out and not args.snapshot:
+        sys.exit("Nothing to do: pass --out and/or --snapshot.")
+    db = DatabaseManager(DATABASE_PATH)
+
+    if args.snapshot:
+        if not db.create_snapshot(args.snapshot):
+            sys.exit(1)
+        print(f"Snapshot written to {args.snapshot}")
+
+    if args.out:
+        since = args.since if args.since is not None else read_watermark(args.state)
+        watermark = db.export_changes_since(since, args.out)
+        if watermark is None:
+            sys.exit(1)
+        if args.since is None:
+            with open(args.state, "w", encoding="utf-8") as f:
+                f.write(str(watermark))
+        print(f"Exported changes {since} -> {watermark} to {args.out}")
@@ -0,0 +1,52 @@
+# serve.py
+# Headless entry point: loads a model and serves it over an OpenAI-compatible API.
+import sys
+import argparse
+from PyQt6.QtCore import QCoreApplication
+
+# Local imports
+from config import (
+    DATABASE_PATH, BASE_MODEL_ID, ADAPTER_MODELS, SERVER_HOST, SERVER_PORT, SERVER_MAX_BATCH_SIZE, SERVER_LOG_TO_DB, SERVER_MAX_NEW_TOKENS,
+    MODEL_CACHE_DIR, MODEL_CACHE_MERGE_ADAPTERS
+)
+from classes.database_manager import DatabaseManager
+from classes.inference_workers import ModelLoaderThread
+from classes.inference_server import InferenceServerThread
+
+def parse_args():
+    adapter_names = [model_config["clean_name"] for model_config in ADAPTER_MODELS]
+    parser = argparse.ArgumentParser(description="Serve a ConvoForge model at /v1/chat/completions.")
+    parser.add_argument("--model", default="Base_Model", choices=["Base_Model"] + adapter_names,
+                        help="Base_Model or the clean_name of an adapter from config.ADAPTER_MODELS.")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--max-batch-size", type=int, default=SERVER_MAX_BATCH_SIZE)
+    parser.add_argument("--max-new-tokens", type=int, default=SERVER_MAX_NEW_TOKENS, help="Upper limit on max_tokens per request.")
+    parser.add_argument("--no-log", action="store_true", help="Do not save exchanges to the database.")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    app = QCoreApplication(sys.argv)
+    adapter_path = next((m["path"] for m in ADAPTER_MODELS if m["clean_name"] == args.model), None)
+    db = None if args.no_log or not SERVER_LOG_TO_DB else DatabaseManager(DATABASE_PATH)
+
+    def on_model_loaded(model, tokenizer):
+        global server_thread
+        server_thread = InferenceServerThread(model, tokenizer, args.model, args.host, args.port, args.max_batch_size, db, args.max_new_tokens)
+        server_thread.started_serving.connect(lambda url: print(f"Serving {args.model} at {url}"))
+        server_thread.error.connect(on_error)
+        server_thread.finished.connect(app.quit)
+        server_thread.start()
+
+    def on_error(message):
+        print(f"Error: {message}")
+        app.exit(1)
+
+    print(f"Loading {args.model}...")
+    loader_thread = ModelLoaderThread(BASE_MODEL_ID, adapter_path, MODEL_CACHE_DIR, MODEL_CACHE_MERGE_ADAPTERS)
+    loader_thread.progress.connect(lambda message: print(f"  {message}"))
+    loader_thread.finished.connect(on_model_loaded)
+    loader_thread.error.connect(on_error)
+    loader_thread.start()
+    sys.exit(app.exec())
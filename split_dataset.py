@@ -0,0 +1,53 @@
+# split_dataset.py
+# Builds, refreshes and exports stratified train/eval splits stored in the database.
+import sys
+import os
+import argparse
+import sqlite3
+
+# Local imports
+from config import DATABASE_PATH, SPLIT_LENGTH_BANDS, SPLIT_EVAL_FRACTION, SPLIT_SEED
+from classes.database_manager import DatabaseManager
+from classes.sampling_engine import SamplingEngine
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build a reproducible train/eval split of the ConvoForge dataset.")
+    parser.add_argument("name", help="Name the split is stored under.")
+    parser.add_argument("--refresh", action="store_true", help="Recompute an existing split with its stored parameters.")
+    parser.add_argument("--eval-fraction", type=float, default=SPLIT_EVAL_FRACTION)
+    parser.add_argument("--max-per-model", type=int, help="Down-sample each source model to at most this many conversations.")
+    parser.add_argument("--models", nargs="+", help="Only include these source models.")
+    parser.add_argument("--exclude-file", help="File with one conversation ID to exclude per line.")
+    parser.add_argument("--seed", default=SPLIT_SEED)
+    parser.add_argument("--export-dir", help="Also write train.jsonl and eval.jsonl here.")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    db = DatabaseManager(DATABASE_PATH)
+    engine = SamplingEngine(db, seed=args.seed)
+    report = lambda seen: print(f"  scanned {seen:,} conversations...")
+
+    if args.refresh:
+        count = engine.refresh_split(args.name, report)
+    else:
+        exclude = []
+        if args.exclude_file:
+            with open(args.exclude_file, "r", encoding="utf-8") as f:
+                exclude = [line.strip() for line in f if line.strip()]
+        count = engine.build_split(args.name, args.eval_fraction, args.max_per_model, SPLIT_LENGTH_BANDS, exclude, args.models, report)
+    if count is None:
+        sys.exit(f"Could not build split '{args.name}'.")
+
+    print(f"Split '{args.name}': {count:,} conversations")
+    for split, stratum, n in db.get_split_counts(args.name) or []:
+        print(f"  {split:<5} {stratum:<40} {n:,}")
+
+    if args.export_dir:
+        os.makedirs(args.export_dir, exist_ok=True)
+        for split in ("train", "eval"):
+            path = os.path.join(args.export_dir, f"{split}.jsonl")
+            try:
+                print(f"Wrote {engine.export_split(args.name, split, path):,} conversations to {path}")
+            except sqlite3.Error as e:
+                sys.exit(f"Could not export {split} split to {path}: {e}")